@@ -24,13 +24,25 @@ Run:
     python3 api_server.py                    # Default port 7438
     python3 api_server.py --port 8080        # Custom port
     uvicorn api_server:app --host 0.0.0.0    # Production
+    gunicorn api_server:app -k uvicorn.workers.UvicornWorker -w 4
+
+Performance:
+    pip install uvloop httptools             # picked up automatically by uvicorn
+    
+    Agent stats, rate limits and the audit buffer live in process memory,
+    so multiple workers (--workers / gunicorn -w) each keep their own copy
+    and race on agents.json. Use one worker until AgentStore has a shared
+    backend (e.g. redis).
 """
 
-import json
+import os
+import sys
 import time
 import hashlib
 import secrets
 import asyncio
+import threading
+import functools
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
@@ -40,9 +52,10 @@ from collections import defaultdict
 
 from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from pydantic import BaseModel, Field, ConfigDict
 import httpx
+import orjson
 
 # ============================================================================
 # Configuration
@@ -52,14 +65,41 @@ MEMORY_PATH = Path.home() / "unified-memory" / "memories.json"
 AGENTS_PATH = Path.home() / "unified-memory" / "agents.json"
 AUDIT_PATH = Path.home() / "unified-memory" / "logs" / "api_audit.jsonl"
 INTERNAL_API = "http://localhost:7437"  # FAISS server
+AUDIT_READ_BLOCK = 64 * 1024  # bytes read per step when tailing the audit log
+INTERNAL_TIMEOUT = 30.0
+HEALTH_TIMEOUT = 5.0
+TIMESTAMP_RESOLUTION = 0.1  # seconds a response timestamp is reused
+
+# "inprocess": search/context run against the FAISS index in this process
+# "http": proxy search/context to INTERNAL_API (writes and stats always do)
+MEMORY_BACKEND = os.environ.get("MEMORY_BACKEND", "inprocess")
 
 # Admin key - in production, use env var
 ADMIN_KEY = "originos-admin-2026"  # Change this!
 
 # Rate limits
 DEFAULT_RATE_LIMIT = 100  # requests per hour
+RATE_WINDOW = 3600  # seconds
+RATE_PRUNE_INTERVAL = 300  # seconds between sweeps of idle rate counters
+KEY_CACHE_SIZE = 1024  # recently verified API keys
+ME_CACHE_TTL = 60.0  # seconds a /v1/me response is reused
 DEFAULT_MAX_AUTHORITY = 3  # max authority level agent can write
 
+# Authority level by memory type
+AUTHORITY = {
+    "hypothesis": 0, "observation": 1, "preference": 1,
+    "lesson": 3, "goal": 3,
+    "procedure": 4, "decision": 4,
+    "constraint": 5,
+}
+
+# Agent stats are flushed to disk in the background
+AGENTS_FLUSH_INTERVAL = 5.0  # seconds
+
+# Audit entries are buffered and appended in batches
+AUDIT_FLUSH_INTERVAL = 1.0  # seconds
+AUDIT_FLUSH_BATCH = 100  # entries
+
 # ============================================================================
 # Models
 # ============================================================================
@@ -133,29 +173,48 @@ class AgentStore:
     
     def __init__(self):
         self.agents: Dict[str, AgentInfo] = {}
-        self.key_to_agent: Dict[str, str] = {}  # key_hash -> agent_id
-        self.rate_counters: Dict[str, List[float]] = defaultdict(list)  # agent_id -> timestamps
+        self.key_to_agent: Dict[bytes, str] = {}  # sha256 digest -> agent_id (hex on disk)
+        self.agent_to_keys: Dict[str, set[bytes]] = defaultdict(set)  # agent_id -> digests
+        self.rate_counters: Dict[str, tuple[int, int, int]] = {}  # agent_id -> (window, prev_count, count)
+        self._dirty = False  # unsaved stats changes
+        self._save_lock = threading.Lock()
+        self._lookup_agent_id = functools.lru_cache(maxsize=KEY_CACHE_SIZE)(self._hash_lookup)
         self._load()
     
     def _load(self):
         """Load agents from disk."""
         if AGENTS_PATH.exists():
             try:
-                data = json.loads(AGENTS_PATH.read_text())
+                data = orjson.loads(AGENTS_PATH.read_bytes())
                 for agent_id, info in data.get("agents", {}).items():
                     self.agents[agent_id] = AgentInfo(**info)
-                self.key_to_agent = data.get("keys", {})
+                for key_hex, agent_id in data.get("keys", {}).items():
+                    key_hash = bytes.fromhex(key_hex)
+                    self.key_to_agent[key_hash] = agent_id
+                    self.agent_to_keys[agent_id].add(key_hash)
             except Exception as e:
                 print(f"Warning: Could not load agents: {e}")
     
     def _save(self):
-        """Save agents to disk."""
+        """Save agents to disk atomically (write temp file, then rename)."""
         AGENTS_PATH.parent.mkdir(parents=True, exist_ok=True)
-        data = {
-            "agents": {k: v.model_dump() for k, v in self.agents.items()},
-            "keys": self.key_to_agent
-        }
-        AGENTS_PATH.write_text(json.dumps(data, indent=2))
+        tmp_path = AGENTS_PATH.with_suffix(".json.tmp")
+        with self._save_lock:
+            data = {
+                "agents": {k: v.model_dump() for k, v in self.agents.items()},
+                "keys": {k.hex(): v for k, v in self.key_to_agent.items()}
+            }
+            with open(tmp_path, "wb") as f:
+                f.write(orjson.dumps(data))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, AGENTS_PATH)
+            self._dirty = False
+    
+    def flush(self):
+        """Persist pending stats changes, if any."""
+        if self._dirty:
+            self._save()
     
     def register(self, req: RegisterAgentRequest) -> tuple[AgentInfo, str]:
         """Register new agent, return info and API key."""
@@ -164,7 +223,7 @@ class AgentStore:
         
         # Generate API key
         api_key = f"omem_{secrets.token_urlsafe(32)}"
-        key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+        key_hash = hashlib.sha256(api_key.encode()).digest()
         
         # Create agent
         agent = AgentInfo(
@@ -178,14 +237,20 @@ class AgentStore:
         
         self.agents[req.agent_id] = agent
         self.key_to_agent[key_hash] = req.agent_id
+        self.agent_to_keys[req.agent_id].add(key_hash)
+        self._lookup_agent_id.cache_clear()
         self._save()
         
         return agent, api_key
     
+    def _hash_lookup(self, api_key: str) -> Optional[str]:
+        """Hash API key and look up its agent_id (memoized per key)."""
+        key_hash = hashlib.sha256(api_key.encode()).digest()
+        return self.key_to_agent.get(key_hash)
+    
     def verify_key(self, api_key: str) -> Optional[AgentInfo]:
         """Verify API key and return agent info."""
-        key_hash = hashlib.sha256(api_key.encode()).hexdigest()
-        agent_id = self.key_to_agent.get(key_hash)
+        agent_id = self._lookup_agent_id(api_key)
         if agent_id:
             return self.agents.get(agent_id)
         return None
@@ -197,21 +262,34 @@ class AgentStore:
             return False
         
         now = time.time()
-        hour_ago = now - 3600
+        window = int(now // RATE_WINDOW)
+        start, prev_count, count = self.rate_counters.get(agent_id, (window, 0, 0))
         
-        # Clean old entries
-        self.rate_counters[agent_id] = [
-            t for t in self.rate_counters[agent_id] if t > hour_ago
-        ]
+        # Roll the window forward
+        if start != window:
+            prev_count = count if start == window - 1 else 0
+            count = 0
+        
+        # Sliding-window estimate: weight previous window by its remaining overlap
+        elapsed = now - window * RATE_WINDOW
+        effective = prev_count * (RATE_WINDOW - elapsed) / RATE_WINDOW + count
         
         # Check limit
-        if len(self.rate_counters[agent_id]) >= agent.rate_limit:
+        if effective >= agent.rate_limit:
+            self.rate_counters[agent_id] = (window, prev_count, count)
             return False
         
         # Record this request
-        self.rate_counters[agent_id].append(now)
+        self.rate_counters[agent_id] = (window, prev_count, count + 1)
         return True
     
+    def prune_rate_counters(self):
+        """Drop counters whose windows no longer affect the limit."""
+        window = int(time.time() // RATE_WINDOW)
+        stale = [a for a, (start, _, _) in self.rate_counters.items() if start < window - 1]
+        for agent_id in stale:
+            del self.rate_counters[agent_id]
+    
     def increment_stats(self, agent_id: str, is_write: bool):
         """Increment agent statistics."""
         agent = self.agents.get(agent_id)
@@ -220,7 +298,7 @@ class AgentStore:
                 agent.total_writes += 1
             else:
                 agent.total_reads += 1
-            self._save()
+            self._dirty = True
     
     def revoke(self, agent_id: str) -> bool:
         """Revoke agent access."""
@@ -230,9 +308,11 @@ class AgentStore:
         del self.agents[agent_id]
         
         # Remove associated keys
-        self.key_to_agent = {
-            k: v for k, v in self.key_to_agent.items() if v != agent_id
-        }
+        for key_hash in self.agent_to_keys.pop(agent_id, ()):
+            self.key_to_agent.pop(key_hash, None)
+        self.rate_counters.pop(agent_id, None)
+        _me_cache.pop(agent_id, None)
+        self._lookup_agent_id.cache_clear()
         
         self._save()
         return True
@@ -247,6 +327,7 @@ class AuditLog:
     
     def __init__(self):
         AUDIT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        self._pending: List[bytes] = []  # serialized entries not yet on disk
     
     def log(self, agent_id: str, action: str, details: Dict[str, Any]):
         """Log an API action."""
@@ -256,26 +337,56 @@ class AuditLog:
             "action": action,
             **details
         }
-        with open(AUDIT_PATH, "a") as f:
-            f.write(json.dumps(entry) + "\n")
+        self._pending.append(orjson.dumps(entry))
+        if len(self._pending) >= AUDIT_FLUSH_BATCH:
+            self.flush()
+    
+    def flush(self):
+        """Append buffered entries to the log in a single write."""
+        if not self._pending:
+            return
+        lines, self._pending = self._pending, []
+        with open(AUDIT_PATH, "ab") as f:
+            f.write(b"\n".join(lines) + b"\n")
     
     def get_recent(self, limit: int = 100, agent_id: Optional[str] = None) -> List[Dict]:
-        """Get recent audit entries."""
+        """Get recent audit entries (reads the log backwards from EOF)."""
+        self.flush()
         if not AUDIT_PATH.exists():
             return []
         
         entries = []
-        with open(AUDIT_PATH) as f:
-            for line in f:
-                try:
-                    entry = json.loads(line)
-                    if agent_id and entry.get("agent_id") != agent_id:
-                        continue
-                    entries.append(entry)
-                except:
-                    pass
+        for line in self._read_lines_reversed():
+            if not line.strip():
+                continue
+            try:
+                entry = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue
+            if agent_id and entry.get("agent_id") != agent_id:
+                continue
+            entries.append(entry)
+            if len(entries) >= limit:
+                break
         
-        return entries[-limit:]
+        entries.reverse()
+        return entries
+    
+    @staticmethod
+    def _read_lines_reversed():
+        """Yield raw lines of the audit log, last line first."""
+        with open(AUDIT_PATH, "rb") as f:
+            pos = f.seek(0, os.SEEK_END)
+            tail = b""
+            while pos > 0:
+                size = min(AUDIT_READ_BLOCK, pos)
+                pos -= size
+                f.seek(pos)
+                lines = (f.read(size) + tail).split(b"\n")
+                tail = lines.pop(0)  # may be a partial line, finish it next block
+                yield from reversed(lines)
+            if tail:
+                yield tail
 
 
 # Global instances
@@ -283,6 +394,16 @@ agent_store = AgentStore()
 audit_log = AuditLog()
 
 
+async def run_periodically(fn, interval: float):
+    """Background task - call fn() every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            fn()
+        except Exception as e:
+            print(f"Warning: Background task {fn.__name__} failed: {e}")
+
+
 # ============================================================================
 # Auth Dependencies
 # ============================================================================
@@ -320,7 +441,39 @@ async def lifespan(app: FastAPI):
     print(f"🚀 Origin Memory API starting on port 7438")
     print(f"   Internal FAISS API: {INTERNAL_API}")
     print(f"   Agents registered: {len(agent_store.agents)}")
+    
+    if MEMORY_BACKEND == "inprocess":
+        sys.path.insert(0, str(Path(__file__).parent))
+        from index import MemoryService
+        app.state.memory_service = MemoryService()
+        try:
+            await asyncio.to_thread(app.state.memory_service.warmup)
+        except Exception as e:
+            print(f"   Warning: Could not preload index: {e}")
+    else:
+        app.state.memory_service = None
+    print(f"   Search backend: {MEMORY_BACKEND}")
+    
+    # Shared keep-alive pool for the internal API
+    app.state.internal_client = httpx.AsyncClient(
+        base_url=INTERNAL_API,
+        timeout=httpx.Timeout(INTERNAL_TIMEOUT),
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=30),
+    )
+    
+    background_tasks = [
+        asyncio.create_task(run_periodically(agent_store.flush, AGENTS_FLUSH_INTERVAL)),
+        asyncio.create_task(run_periodically(audit_log.flush, AUDIT_FLUSH_INTERVAL)),
+        asyncio.create_task(run_periodically(agent_store.prune_rate_counters, RATE_PRUNE_INTERVAL)),
+    ]
+    
     yield
+    
+    for task in background_tasks:
+        task.cancel()
+    agent_store.flush()
+    audit_log.flush()
+    await app.state.internal_client.aclose()
     print("👋 Shutting down")
 
 
@@ -328,7 +481,8 @@ app = FastAPI(
     title="Origin Memory API",
     description="Multi-agent memory system with authentication and trust scoring",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -346,48 +500,71 @@ app.add_middleware(
 
 def get_authority(memory_type: str) -> int:
     """Get authority level for memory type."""
-    return {
-        "hypothesis": 0, "observation": 1, "preference": 1,
-        "lesson": 3, "goal": 3,
-        "procedure": 4, "decision": 4,
-        "constraint": 5,
-    }.get(memory_type, 0)
+    return AUTHORITY.get(memory_type, 0)
+
+
+_timestamp_cache = (0.0, "")  # (generated_at, formatted)
+
+
+def utc_timestamp() -> str:
+    """ISO-8601 UTC timestamp for responses, reused for TIMESTAMP_RESOLUTION seconds."""
+    global _timestamp_cache
+    now = time.time()
+    if now - _timestamp_cache[0] > TIMESTAMP_RESOLUTION:
+        _timestamp_cache = (now, datetime.utcfromtimestamp(now).isoformat() + "Z")
+    return _timestamp_cache[1]
 
 
 async def call_internal_api(method: str, endpoint: str, data: dict = None) -> dict:
     """Call internal FAISS API."""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        url = f"{INTERNAL_API}{endpoint}"
-        if method == "GET":
-            resp = await client.get(url)
-        else:
-            resp = await client.post(url, json=data)
-        
-        if resp.status_code != 200:
-            raise HTTPException(502, f"Internal API error: {resp.text}")
-        
-        return resp.json()
+    client: httpx.AsyncClient = app.state.internal_client
+    if method == "GET":
+        resp = await client.get(endpoint)
+    else:
+        resp = await client.post(endpoint, json=data)
+    
+    if resp.status_code != 200:
+        raise HTTPException(502, f"Internal API error: {resp.text}")
+    
+    return resp.json()
 
 
 # ============================================================================
 # Public Endpoints
 # ============================================================================
 
+# Static responses are serialized once at import
+_ROOT_PAYLOAD = orjson.dumps({
+    "name": "Origin Memory API",
+    "version": "2.0.0",
+    "docs": "/docs",
+    "endpoints": {
+        "search": "POST /v1/search",
+        "context": "POST /v1/context",
+        "write": "POST /v1/write",
+        "stats": "GET /v1/stats",
+        "types": "GET /v1/types"
+    }
+})
+
+_TYPES_PAYLOAD = orjson.dumps({
+    "types": [
+        {"type": "constraint", "authority": 5, "description": "Hard rules, must-follow guidelines"},
+        {"type": "decision", "authority": 4, "description": "Choices made with rationale"},
+        {"type": "procedure", "authority": 4, "description": "How to do things, steps"},
+        {"type": "goal", "authority": 3, "description": "Objectives, targets"},
+        {"type": "lesson", "authority": 3, "description": "Learned from experience"},
+        {"type": "preference", "authority": 1, "description": "User/agent preferences"},
+        {"type": "observation", "authority": 1, "description": "Noticed patterns"},
+        {"type": "hypothesis", "authority": 0, "description": "Untested ideas"},
+    ]
+})
+
+
 @app.get("/")
 async def root():
     """API info."""
-    return {
-        "name": "Origin Memory API",
-        "version": "2.0.0",
-        "docs": "/docs",
-        "endpoints": {
-            "search": "POST /v1/search",
-            "context": "POST /v1/context",
-            "write": "POST /v1/write",
-            "stats": "GET /v1/stats",
-            "types": "GET /v1/types"
-        }
-    }
+    return Response(content=_ROOT_PAYLOAD, media_type="application/json")
 
 
 @app.get("/health")
@@ -395,9 +572,8 @@ async def health():
     """Health check."""
     # Check internal API
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.get(f"{INTERNAL_API}/health")
-            internal_ok = resp.status_code == 200
+        resp = await app.state.internal_client.get("/health", timeout=HEALTH_TIMEOUT)
+        internal_ok = resp.status_code == 200
     except:
         internal_ok = False
     
@@ -411,18 +587,7 @@ async def health():
 @app.get("/v1/types")
 async def list_types():
     """List memory types (public endpoint)."""
-    return {
-        "types": [
-            {"type": "constraint", "authority": 5, "description": "Hard rules, must-follow guidelines"},
-            {"type": "decision", "authority": 4, "description": "Choices made with rationale"},
-            {"type": "procedure", "authority": 4, "description": "How to do things, steps"},
-            {"type": "goal", "authority": 3, "description": "Objectives, targets"},
-            {"type": "lesson", "authority": 3, "description": "Learned from experience"},
-            {"type": "preference", "authority": 1, "description": "User/agent preferences"},
-            {"type": "observation", "authority": 1, "description": "Noticed patterns"},
-            {"type": "hypothesis", "authority": 0, "description": "Untested ideas"},
-        ]
-    }
+    return Response(content=_TYPES_PAYLOAD, media_type="application/json")
 
 
 # ============================================================================
@@ -432,26 +597,34 @@ async def list_types():
 @app.post("/v1/search")
 async def search(req: SearchRequest, agent: AgentInfo = Depends(verify_agent)):
     """Semantic search over memories."""
+    memory_type = req.memory_type.value if req.memory_type else None
     
-    result = await call_internal_api("POST", "/search", {
-        "query": req.query,
-        "n": req.top_k,
-        "type": req.memory_type.value if req.memory_type else None,
-        "min_authority": req.min_authority
-    })
+    service = app.state.memory_service
+    if service:
+        results = await asyncio.to_thread(
+            service.search, req.query, req.top_k, memory_type, req.min_authority
+        )
+    else:
+        result = await call_internal_api("POST", "/search", {
+            "query": req.query,
+            "n": req.top_k,
+            "type": memory_type,
+            "min_authority": req.min_authority
+        })
+        results = result.get("results", [])
     
     # Log
     audit_log.log(agent.agent_id, "search", {
         "query": req.query,
-        "results": len(result.get("results", []))
+        "results": len(results)
     })
     agent_store.increment_stats(agent.agent_id, is_write=False)
     
     return {
         "agent": agent.agent_id,
         "query": req.query,
-        "results": result.get("results", []),
-        "timestamp": datetime.utcnow().isoformat() + "Z"
+        "results": results,
+        "timestamp": utc_timestamp()
     }
 
 
@@ -459,10 +632,15 @@ async def search(req: SearchRequest, agent: AgentInfo = Depends(verify_agent)):
 async def get_context(req: ContextRequest, agent: AgentInfo = Depends(verify_agent)):
     """Get LLM-formatted context block."""
     
-    result = await call_internal_api("POST", "/context", {
-        "query": req.query,
-        "max_tokens": req.max_tokens
-    })
+    service = app.state.memory_service
+    if service:
+        context = await asyncio.to_thread(service.search_for_context, req.query, req.max_tokens)
+    else:
+        result = await call_internal_api("POST", "/context", {
+            "query": req.query,
+            "max_tokens": req.max_tokens
+        })
+        context = result.get("context", "")
     
     audit_log.log(agent.agent_id, "context", {"query": req.query})
     agent_store.increment_stats(agent.agent_id, is_write=False)
@@ -470,8 +648,8 @@ async def get_context(req: ContextRequest, agent: AgentInfo = Depends(verify_age
     return {
         "agent": agent.agent_id,
         "query": req.query,
-        "context": result.get("context", ""),
-        "timestamp": datetime.utcnow().isoformat() + "Z"
+        "context": context,
+        "timestamp": utc_timestamp()
     }
 
 
@@ -513,7 +691,7 @@ async def write_memory(req: WriteRequest, agent: AgentInfo = Depends(verify_agen
         "status": "created",
         "type": req.memory_type.value,
         "authority": required_authority,
-        "timestamp": datetime.utcnow().isoformat() + "Z"
+        "timestamp": utc_timestamp()
     }
 
 
@@ -528,14 +706,23 @@ async def get_stats(agent: AgentInfo = Depends(verify_agent)):
     return {
         "agent": agent.agent_id,
         **result,
-        "timestamp": datetime.utcnow().isoformat() + "Z"
+        "timestamp": utc_timestamp()
     }
 
 
+# agent_id -> (expires_at, serialized /v1/me body)
+_me_cache: Dict[str, tuple[float, bytes]] = {}
+
+
 @app.get("/v1/me")
 async def get_me(agent: AgentInfo = Depends(verify_agent)):
-    """Get current agent info."""
-    return {
+    """Get current agent info (counters may lag by up to ME_CACHE_TTL seconds)."""
+    now = time.monotonic()
+    cached = _me_cache.get(agent.agent_id)
+    if cached and cached[0] > now:
+        return Response(content=cached[1], media_type="application/json")
+    
+    body = orjson.dumps({
         "agent_id": agent.agent_id,
         "name": agent.name,
         "description": agent.description,
@@ -544,7 +731,9 @@ async def get_me(agent: AgentInfo = Depends(verify_agent)):
         "reputation": agent.reputation,
         "total_reads": agent.total_reads,
         "total_writes": agent.total_writes
-    }
+    })
+    _me_cache[agent.agent_id] = (now + ME_CACHE_TTL, body)
+    return Response(content=body, media_type="application/json")
 
 
 # ============================================================================
@@ -608,6 +797,15 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Origin Memory API Server")
     parser.add_argument("--port", type=int, default=7438, help="Port to run on")
     parser.add_argument("--host", default="127.0.0.1", help="Host to bind to")
+    parser.add_argument("--workers", type=int, default=1,
+                        help=f"Worker processes (max {os.cpu_count()}; see docstring before raising)")
     args = parser.parse_args()
     
-    uvicorn.run(app, host=args.host, port=args.port)
+    uvicorn.run(
+        "api_server:app" if args.workers > 1 else app,
+        host=args.host,
+        port=args.port,
+        workers=min(args.workers, os.cpu_count() or 1),
+        loop="auto",   # uvloop when installed
+        http="auto",   # httptools when installed
+    )
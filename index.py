@@ -11,24 +11,56 @@ Usage:
     python3 index.py search "query" -n 5 -t lesson  # Filter by type
 """
 
-import json
 import os
 import sys
 import argparse
 import pickle
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
 from typing import List, Dict, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import numpy as np
 
+from store_io import load_json_mmap, merge_journal
+
 # Lazy imports for speed
 _model = None
-_index = None
-_memories = None
+_active = None  # ActiveIndex searched by readers, replaced whole (see set_active_index)
+_index_lock = threading.RLock()  # guards in-place adds, publishing and index file writes
+_save_pending = False
 
 MEMORY_PATH = Path.home() / "unified-memory" / "memories.json"
+MEMORY_JOURNAL_PATH = MEMORY_PATH.with_suffix(".jsonl")  # appended since last compaction
 INDEX_DIR = Path.home() / "unified-memory" / "index"
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # Fast, good quality, 384 dims
+EMBEDDING_BATCH_SIZE = 64
+QUERY_CACHE_SIZE = 4096  # cached query embeddings
+
+# Exact search below this size, HNSW (approximate) above it.
+# MEMORY_INDEX_TYPE=flat|hnsw forces one or the other.
+INDEX_TYPE = os.environ.get("MEMORY_INDEX_TYPE", "auto")
+HNSW_THRESHOLD = 5_000
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# Authority level by type - higher = more trusted
+AUTHORITY = {
+    "hypothesis": 0,
+    "observation": 1,
+    "preference": 1,
+    "lesson": 3,
+    "goal": 3,
+    "procedure": 4,
+    "decision": 4,
+    "constraint": 5,
+}
+
+# Compact integer ids for memory types (columnar metadata)
+TYPE_IDS = {t: i for i, t in enumerate(AUTHORITY)}
 
 @dataclass
 class SearchResult:
@@ -39,18 +71,72 @@ class SearchResult:
     authority: int
     tags: List[str]
 
+class _ReadWriteLock:
+    """Any number of shared holders or one exclusive holder; waiting writers go first"""
+    
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+    
+    @contextmanager
+    def shared(self):
+        with self._cond:
+            while self._writing or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+    
+    @contextmanager
+    def exclusive(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+# FAISS allows concurrent searches but not a search during an add:
+# searches hold this shared, in-place adds exclusively
+_search_lock = _ReadWriteLock()
+
+@dataclass
+class ActiveIndex:
+    """
+    One consistent view of the loaded index.
+    
+    Readers take a single reference to it and use only that, so a swap
+    never shows them a half-loaded index or mismatched filter columns.
+    index, memories and ids grow in place (add_to_index, under _search_lock);
+    everything else is replaced by publishing a new ActiveIndex.
+    """
+    index: object
+    memories: List[Dict]
+    authority: np.ndarray  # np.int8 per indexed memory
+    type_ids: np.ndarray   # np.int8 per indexed memory (TYPE_IDS, -1 = any other type)
+    selectors: Dict = field(default_factory=dict)  # (memory_type, min_authority) -> (count, faiss.IDSelector)
+    ids: Optional[set] = None  # memory ids in the index, for O(1) duplicate checks
+    
+    def __post_init__(self):
+        if self.ids is None:
+            self.ids = {m["id"] for m in self.memories}
+
 def get_authority(memory_type: str) -> int:
     """Authority level by type - higher = more trusted"""
-    return {
-        "hypothesis": 0,
-        "observation": 1,
-        "preference": 1,
-        "lesson": 3,
-        "goal": 3,
-        "procedure": 4,
-        "decision": 4,
-        "constraint": 5,
-    }.get(memory_type, 0)
+    return AUTHORITY.get(memory_type, 0)
 
 def load_model():
     """Lazy load embedding model"""
@@ -61,79 +147,92 @@ def load_model():
         _model = SentenceTransformer(EMBEDDING_MODEL)
     return _model
 
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def embed_query(query: str) -> np.ndarray:
+    """Normalized (1, dim) query embedding - cached, do not modify in place"""
+    model = load_model()
+    return model.encode(
+        [query], convert_to_numpy=True, normalize_embeddings=True
+    ).astype(np.float32, copy=False)
+
+def embed_queries(queries: List[str]) -> np.ndarray:
+    """Normalized (len(queries), dim) embeddings in a single forward pass"""
+    model = load_model()
+    return model.encode(
+        queries, batch_size=len(queries), convert_to_numpy=True, normalize_embeddings=True
+    ).astype(np.float32, copy=False)
+
 def load_memories() -> List[Dict]:
-    """Load memories from JSON"""
-    if not MEMORY_PATH.exists():
-        print(f"No memories found at {MEMORY_PATH}")
-        return []
+    """Load memories from JSON snapshot + journal"""
+    memories = []
+    if MEMORY_PATH.exists():
+        data = load_json_mmap(MEMORY_PATH)
+        
+        # Handle both formats
+        if isinstance(data, dict) and "memories" in data:
+            memories = data["memories"]
+        elif isinstance(data, list):
+            memories = data
     
-    with open(MEMORY_PATH) as f:
-        data = json.load(f)
+    merge_journal(memories, MEMORY_JOURNAL_PATH)
     
-    # Handle both formats
-    if isinstance(data, dict) and "memories" in data:
-        return data["memories"]
-    elif isinstance(data, list):
-        return data
-    else:
-        return []
+    if not memories:
+        print(f"No memories found at {MEMORY_PATH}")
+    return memories
 
-def build_index():
-    """Build FAISS index from memories"""
+def embedding_text(mem: Dict) -> str:
+    """Text to embed for a memory (content + type + tags + rationale)"""
+    text = f"{mem.get('type', 'unknown')}: {mem.get('content', '')}"
+    if mem.get('tags'):
+        text += f" [{', '.join(mem['tags'])}]"
+    if mem.get('rationale'):
+        text += f" Rationale: {mem['rationale']}"
+    return text
+
+def embed_and_index(memories: List[Dict]):
+    """Embed memories into a new FAISS index (flat or HNSW by size); returns (index, metadata)"""
     import faiss
     
-    memories = load_memories()
-    if not memories:
-        print("No memories to index")
-        return
-    
-    print(f"Indexing {len(memories)} memories...")
-    
     model = load_model()
     
-    # Create text for each memory (content + type + tags)
-    texts = []
-    for mem in memories:
-        text = f"{mem.get('type', 'unknown')}: {mem.get('content', '')}"
-        if mem.get('tags'):
-            text += f" [{', '.join(mem['tags'])}]"
-        if mem.get('rationale'):
-            text += f" Rationale: {mem['rationale']}"
-        texts.append(text)
-    
-    # Generate embeddings
-    print("Generating embeddings...")
-    embeddings = model.encode(texts, show_progress_bar=True, convert_to_numpy=True)
+    texts = [embedding_text(mem) for mem in memories]
     
-    # Normalize for cosine similarity
-    faiss.normalize_L2(embeddings)
+    # Generate embeddings, normalized for cosine similarity
+    print("Generating embeddings...")
+    embeddings = model.encode(
+        texts,
+        batch_size=EMBEDDING_BATCH_SIZE,
+        show_progress_bar=True,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    ).astype(np.float32, copy=False)
     
     # Build FAISS index (Inner Product = cosine similarity after normalization)
     dim = embeddings.shape[1]
-    index = faiss.IndexFlatIP(dim)
+    use_hnsw = INDEX_TYPE == "hnsw" or (INDEX_TYPE == "auto" and len(memories) >= HNSW_THRESHOLD)
+    if use_hnsw:
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH  # persisted with the index
+    else:
+        index = faiss.IndexFlatIP(dim)
     index.add(embeddings)
     
-    # Save
-    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    return index, [metadata_row(mem) for mem in memories]
+
+def build_index():
+    """Build FAISS index from memories"""
+    memories = load_memories()
+    if not memories:
+        print("No memories to index")
+        return
     
-    faiss.write_index(index, str(INDEX_DIR / "faiss.index"))
+    print(f"Indexing {len(memories)} memories...")
+    index, metadata = embed_and_index(memories)
+    write_index_files(index, metadata)
     
-    # Save memory metadata (for retrieval)
-    metadata = []
-    for mem in memories:
-        metadata.append({
-            "id": mem.get("id", "unknown"),
-            "type": mem.get("type", "unknown"),
-            "content": mem.get("content", ""),
-            "tags": mem.get("tags", []),
-            "authority": get_authority(mem.get("type", "")),
-            "provenance": mem.get("provenance", {}),
-        })
-    
-    with open(INDEX_DIR / "metadata.pkl", "wb") as f:
-        pickle.dump(metadata, f)
-    
-    print(f"✅ Index built: {len(memories)} memories, {dim} dimensions")
+    kind = "HNSW" if hasattr(index, "hnsw") else "flat"
+    print(f"✅ Index built: {len(memories)} memories, {index.d} dimensions ({kind})")
     print(f"   Saved to: {INDEX_DIR}")
     
     # Print type distribution
@@ -145,71 +244,260 @@ def build_index():
     for t, count in sorted(types.items(), key=lambda x: -x[1]):
         print(f"  {t}: {count}")
 
+def metadata_row(mem: Dict) -> Dict:
+    """Memory metadata kept alongside the index (for retrieval)"""
+    return {
+        "id": mem.get("id", "unknown"),
+        "type": mem.get("type", "unknown"),
+        "content": mem.get("content", ""),
+        "tags": mem.get("tags", []),
+        "authority": get_authority(mem.get("type", "")),
+        "provenance": mem.get("provenance", {}),
+    }
+
+def write_index_files(index, metadata: List[Dict]):
+    """Persist index, metadata and filter columns (each file replaced atomically)"""
+    import faiss
+    
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    
+    def replace(name: str, write):
+        tmp_path = INDEX_DIR / f"{name}.tmp"
+        write(tmp_path)
+        os.replace(tmp_path, INDEX_DIR / name)
+    
+    def write_pickle(tmp_path):
+        with open(tmp_path, "wb") as f:
+            pickle.dump(metadata, f)
+    
+    def write_array(array):
+        def write(tmp_path):
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+        return write
+    
+    with _index_lock:
+        # Columnar filter fields, memory-mapped at load time
+        authority, type_ids = metadata_columns(metadata)
+        replace("metadata.pkl", write_pickle)
+        replace("authority.npy", write_array(authority))
+        replace("type_ids.npy", write_array(type_ids))
+        # Written last: its mtime tells readers (MemoryService) to reload
+        replace("faiss.index", lambda tmp_path: faiss.write_index(index, str(tmp_path)))
+
+def metadata_columns(metadata: List[Dict]):
+    """Authority and type-id arrays, parallel to metadata"""
+    authority = np.fromiter((m["authority"] for m in metadata), dtype=np.int8, count=len(metadata))
+    type_ids = np.fromiter((TYPE_IDS.get(m["type"], -1) for m in metadata), dtype=np.int8, count=len(metadata))
+    return authority, type_ids
+
+def read_index_files() -> ActiveIndex:
+    """Load FAISS index and metadata from disk without publishing them"""
+    import faiss
+    index_path = INDEX_DIR / "faiss.index"
+    meta_path = INDEX_DIR / "metadata.pkl"
+    
+    if not index_path.exists():
+        print("Index not found. Run: python3 index.py build")
+        sys.exit(1)
+    
+    index = faiss.read_index(str(index_path))
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    with open(meta_path, "rb") as f:
+        memories = pickle.load(f)
+    
+    authority_path = INDEX_DIR / "authority.npy"
+    type_ids_path = INDEX_DIR / "type_ids.npy"
+    if authority_path.exists() and type_ids_path.exists():
+        authority = np.load(authority_path, mmap_mode="r")
+        type_ids = np.load(type_ids_path, mmap_mode="r")
+    else:
+        # Index built before columnar metadata existed
+        authority, type_ids = metadata_columns(memories)
+    return ActiveIndex(index, memories, authority, type_ids)
+
+def set_active_index(active: ActiveIndex):
+    """Publish a loaded index; searches already running keep the one they started with"""
+    global _active
+    with _index_lock:
+        _active = active
+
+def reload_index():
+    """Load the index files again and publish them in one step"""
+    set_active_index(read_index_files())
+
+def rebuild_index():
+    """
+    Rebuild the index from the store, save it and publish it.
+    
+    Embedding runs without _index_lock, so in-place adds carry on against
+    the current index meanwhile. Rows they added that the rebuilt index
+    lacks are copied over under the lock, just before it is published.
+    """
+    memories = load_memories()
+    if not memories:
+        return
+    index, metadata = embed_and_index(memories)
+    
+    with _index_lock:
+        active = _active
+        if active is not None:
+            known = {m["id"] for m in metadata}
+            missing = [i for i, m in enumerate(active.memories) if m["id"] not in known]
+            if missing:
+                index.add(np.vstack([active.index.reconstruct(i) for i in missing]))
+                metadata.extend(active.memories[i] for i in missing)
+        
+        write_index_files(index, metadata)
+        authority, type_ids = metadata_columns(metadata)
+        set_active_index(ActiveIndex(index, metadata, authority, type_ids))
+
+def active_index() -> ActiveIndex:
+    """The published index, loading it from disk on first use"""
+    active = _active
+    if active is None:
+        with _index_lock:
+            if _active is None:
+                set_active_index(read_index_files())
+            active = _active
+    return active
+
 def load_index():
     """Load FAISS index and metadata"""
-    global _index, _memories
+    active = active_index()
+    return active.index, active.memories
+
+def add_to_index(mem: Dict) -> bool:
+    """
+    Embed one memory and add it to the loaded index in place.
     
-    if _index is None:
-        import faiss
-        index_path = INDEX_DIR / "faiss.index"
-        meta_path = INDEX_DIR / "metadata.pkl"
-        
-        if not index_path.exists():
-            print("Index not found. Run: python3 index.py build")
-            sys.exit(1)
+    Rows are positional and only ever appended, so existing ids stay
+    stable. Files are written in the background (see schedule_save).
+    Returns False if the memory is already indexed.
+    """
+    vec = load_model().encode(
+        [embedding_text(mem)], convert_to_numpy=True, normalize_embeddings=True
+    ).astype(np.float32, copy=False)
+    
+    with _index_lock:
+        active = active_index()
+        mem_id = mem.get("id", "unknown")
+        if mem_id in active.ids:
+            return False
         
-        _index = faiss.read_index(str(index_path))
-        with open(meta_path, "rb") as f:
-            _memories = pickle.load(f)
+        row = metadata_row(mem)
+        with _search_lock.exclusive():
+            active.memories.append(row)
+            active.index.add(vec)
+            active.ids.add(mem_id)
+        set_active_index(ActiveIndex(
+            active.index,
+            active.memories,
+            np.append(active.authority, np.int8(row["authority"])),
+            np.append(active.type_ids, np.int8(TYPE_IDS.get(row["type"], -1))),
+            ids=active.ids,
+        ))
     
-    return _index, _memories
+    schedule_save()
+    return True
 
-def search(
-    query: str,
+def _save_worker():
+    global _save_pending
+    with _index_lock:
+        _save_pending = False
+        write_index_files(_active.index, _active.memories)
+
+def schedule_save():
+    """Persist the in-memory index from a background thread (coalesces bursts of adds)"""
+    global _save_pending
+    with _index_lock:
+        if _save_pending:
+            return
+        _save_pending = True
+    threading.Thread(target=_save_worker, daemon=True).start()
+
+def filter_selector(active: ActiveIndex, memory_type: Optional[str], min_authority: int):
+    """FAISS ID selector for rows of active matching the filters (cached per filter)"""
+    key = (memory_type, min_authority)
+    selector = active.selectors.get(key)
+    if selector is None:
+        import faiss
+        mask = np.ones(len(active.authority), dtype=bool)
+        if memory_type in TYPE_IDS:
+            mask &= active.type_ids == TYPE_IDS[memory_type]
+        elif memory_type:
+            # Custom types share type id -1, so compare the type strings themselves
+            rows = islice(active.memories, len(mask))
+            mask &= np.fromiter((m["type"] == memory_type for m in rows), dtype=bool, count=len(mask))
+        if min_authority:
+            mask &= active.authority >= min_authority
+        ids = np.flatnonzero(mask).astype(np.int64)
+        selector = active.selectors[key] = (len(ids), faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids)))
+    return selector
+
+def search_vectors(
+    query_vecs: np.ndarray,
     n: int = 5,
     memory_type: Optional[str] = None,
     min_authority: int = 0,
-) -> List[SearchResult]:
-    """Semantic search over memories"""
-    
-    model = load_model()
-    index, memories = load_index()
+) -> List[List[SearchResult]]:
+    """Search with precomputed (nq, dim) query embeddings - one result list per row"""
     
-    # Embed query
-    query_vec = model.encode([query], convert_to_numpy=True)
+    # One reference for the whole search, even if a rebuild publishes meanwhile
+    active = active_index()
+    index, memories = active.index, active.memories
     import faiss
-    faiss.normalize_L2(query_vec)
     
-    # Search (get more results if filtering)
-    k = min(n * 3, len(memories)) if memory_type or min_authority else n
-    scores, indices = index.search(query_vec, k)
+    # Restrict the search to matching rows instead of over-fetching
+    params = None
+    k = n
+    if memory_type or min_authority:
+        count, selector = filter_selector(active, memory_type, min_authority)
+        if not count:
+            return [[] for _ in range(len(query_vecs))]
+        k = min(n, count)
+        if hasattr(index, "hnsw"):
+            # HNSW indexes reject plain SearchParameters on older FAISS releases
+            params = faiss.SearchParametersHNSW(sel=selector, efSearch=max(HNSW_EF_SEARCH, k))
+        else:
+            params = faiss.SearchParameters(sel=selector)
     
-    results = []
-    for score, idx in zip(scores[0], indices[0]):
-        if idx < 0:
-            continue
-        
-        mem = memories[idx]
-        
-        # Apply filters
-        if memory_type and mem["type"] != memory_type:
-            continue
-        if mem["authority"] < min_authority:
-            continue
-        
-        results.append(SearchResult(
-            memory_id=mem["id"],
-            memory_type=mem["type"],
-            content=mem["content"],
-            score=float(score),
-            authority=mem["authority"],
-            tags=mem["tags"],
-        ))
-        
-        if len(results) >= n:
-            break
+    with _search_lock.shared():
+        scores, indices = index.search(query_vecs, k, params=params)
+    
+    batch = []
+    for row_scores, row_indices in zip(scores, indices):
+        results = []
+        for score, idx in zip(row_scores, row_indices):
+            if idx < 0:
+                continue
+            
+            mem = memories[idx]
+            
+            results.append(SearchResult(
+                memory_id=mem["id"],
+                memory_type=mem["type"],
+                content=mem["content"],
+                score=float(score),
+                authority=mem["authority"],
+                tags=mem["tags"],
+            ))
+            
+            if len(results) >= n:
+                break
+        batch.append(results)
     
-    return results
+    return batch
+
+def search(
+    query: str,
+    n: int = 5,
+    memory_type: Optional[str] = None,
+    min_authority: int = 0,
+) -> List[SearchResult]:
+    """Semantic search over memories"""
+    return search_vectors(embed_query(query), n=n, memory_type=memory_type, min_authority=min_authority)[0]
 
 def search_for_context(query: str, max_tokens: int = 2000) -> str:
     """
@@ -240,6 +528,57 @@ def search_for_context(query: str, max_tokens: int = 2000) -> str:
     lines.append("</relevant_memories>")
     return "\n".join(lines)
 
+class MemoryService:
+    """
+    In-process search for long-running servers.
+    Reloads the index when it is rebuilt on disk (e.g. by server.py).
+    """
+    
+    def __init__(self):
+        self._index_mtime = None
+        self._lock = threading.Lock()
+    
+    def _refresh(self):
+        mtime = (INDEX_DIR / "faiss.index").stat().st_mtime_ns
+        if mtime == self._index_mtime:
+            return
+        with self._lock:
+            if mtime != self._index_mtime:
+                reload_index()
+                self._index_mtime = mtime
+    
+    def warmup(self):
+        """Load model and index up front and run one encode to initialize kernels"""
+        model = load_model()
+        model.eval()
+        model.encode(["warmup"], convert_to_numpy=True)
+        self._refresh()
+    
+    def search(
+        self,
+        query: str,
+        n: int = 5,
+        memory_type: Optional[str] = None,
+        min_authority: int = 0,
+    ) -> List[Dict]:
+        """Semantic search, results as JSON-ready dicts"""
+        self._refresh()
+        return [
+            {
+                "id": r.memory_id,
+                "type": r.memory_type,
+                "content": r.content,
+                "score": r.score,
+                "authority": r.authority,
+                "tags": r.tags,
+            }
+            for r in search(query, n=n, memory_type=memory_type, min_authority=min_authority)
+        ]
+    
+    def search_for_context(self, query: str, max_tokens: int = 2000) -> str:
+        self._refresh()
+        return search_for_context(query, max_tokens=max_tokens)
+
 def main():
     parser = argparse.ArgumentParser(description="Unified Memory Vector Index")
     subparsers = parser.add_subparsers(dest="command")
@@ -20,10 +20,16 @@ Usage:
     npx @modelcontextprotocol/inspector python3 mcp_server.py
 """
 
-import json
+import asyncio
+import atexit
+import bisect
+import io
 import sys
 import time
-import hashlib
+import operator
+import secrets
+from collections import Counter
+from itertools import accumulate
 from pathlib import Path
 from typing import Optional, List
 from enum import Enum
@@ -31,13 +37,41 @@ from enum import Enum
 from mcp.server.fastmcp import FastMCP
 from pydantic import BaseModel, Field, ConfigDict
 
+from query_cache import QueryCache, SemanticQueryCache
+from store_io import json_dumps as _json_dumps, load_json_mmap, merge_journal, append_journal, compact_journal
+
+try:
+    import httpx
+except ImportError:  # rebuild notifications are best-effort
+    httpx = None
+
 # Paths
 MEMORY_PATH = Path.home() / "unified-memory" / "memories.json"
+MEMORY_JOURNAL_PATH = MEMORY_PATH.with_suffix(".jsonl")  # appended memories since last compaction
+JOURNAL_COMPACT_BYTES = 1 << 20  # fold the journal into MEMORY_PATH above this size
 INDEX_DIR = Path.home() / "unified-memory" / "index"
+MEMORY_API_URL = "http://localhost:7437"  # server.py
 
 # Initialize MCP server
 mcp = FastMCP("origin_memory_mcp")
 
+# Keep-alive connection to server.py for index updates
+_http = httpx.Client(base_url=MEMORY_API_URL, timeout=1.0) if httpx else None
+if _http is not None:
+    atexit.register(_http.close)
+
+# Memoized index module (first import pays for numpy/FAISS setup)
+_idx = None
+
+# Search results keyed on (query, top_k, memory_type, min_authority)
+query_cache = QueryCache(max_size=2000, ttl_seconds=300)
+# Same results for paraphrased queries (cosine >= 0.92 between query embeddings)
+semantic_cache = SemanticQueryCache(threshold=0.92, max_size=1024, ttl_seconds=300)
+
+# Concurrent searches are coalesced into one embedding pass
+SEARCH_BATCH_SIZE = 8
+SEARCH_BATCH_WAIT = 0.005  # seconds to wait for more queries to join a batch
+
 
 # ============================================================================
 # Enums and Input Models
@@ -142,25 +176,173 @@ class ContextInput(BaseModel):
 # Helper Functions
 # ============================================================================
 
+_AUTHORITY = {
+    "hypothesis": 0,
+    "observation": 1,
+    "preference": 1,
+    "lesson": 3,
+    "goal": 3,
+    "procedure": 4,
+    "decision": 4,
+    "constraint": 5,
+}
+
+# Memory types in stats display order (highest authority first)
+_KNOWN_TYPES = ("constraint", "decision", "procedure", "goal", "lesson", "preference", "observation", "hypothesis")
+
+# Context ordering: authority (highest first), then score
+_CONTEXT_SORT_KEY = operator.itemgetter("authority", "score")
+
+# Score bars indexed by int(score * 10)
+_BARS = tuple("█" * i + "░" * (10 - i) for i in range(11))
+
+
 def get_authority(memory_type: str) -> int:
     """Get authority level for memory type."""
-    return {
-        "hypothesis": 0,
-        "observation": 1,
-        "preference": 1,
-        "lesson": 3,
-        "goal": 3,
-        "procedure": 4,
-        "decision": 4,
-        "constraint": 5,
-    }.get(memory_type, 0)
+    return _AUTHORITY.get(memory_type, 0)
+
+
+def load_store() -> dict:
+    """Load the memory snapshot with journaled memories merged in."""
+    if MEMORY_PATH.exists():
+        store = load_json_mmap(MEMORY_PATH)
+    else:
+        store = {"memories": [], "schema_version": "1.0"}
+    
+    merge_journal(store.setdefault("memories", []), MEMORY_JOURNAL_PATH)
+    return store
+
+
+def append_memory(memory: dict) -> None:
+    """Append one memory to the journal (O(1), no rewrite of existing memories)."""
+    if append_journal(MEMORY_JOURNAL_PATH, _json_dumps(memory) + b"\n") > JOURNAL_COMPACT_BYTES:
+        compact_journal(MEMORY_PATH, MEMORY_JOURNAL_PATH)
 
 
 def load_index_module():
-    """Lazy load the index module."""
-    sys.path.insert(0, str(Path.home() / "unified-memory"))
-    import index as idx
-    return idx
+    """Lazy load the index module (once)."""
+    global _idx
+    if _idx is None:
+        sys.path.insert(0, str(Path.home() / "unified-memory"))
+        import index as idx
+        _idx = idx
+    return _idx
+
+
+def run_search_batch(batch: list) -> list:
+    """
+    Run [(query, (top_k, memory_type, min_authority)), ...] searches together.
+    
+    All queries are embedded in one forward pass; queries sharing params go
+    to FAISS as a single multi-row search. Returns result dicts per entry.
+    """
+    idx = load_index_module()
+    queries = list(dict.fromkeys(query for query, _ in batch))
+    rows = {query: i for i, query in enumerate(queries)}
+    query_vecs = idx.embed_queries(queries)
+    
+    results = [None] * len(batch)
+    pending = {}  # params -> positions in batch still to search
+    for pos, (query, params) in enumerate(batch):
+        row = rows[query]
+        results[pos] = semantic_cache.get(query_vecs[row:row + 1], params)
+        if results[pos] is None:
+            pending.setdefault(params, []).append(pos)
+    
+    for params, positions in pending.items():
+        top_k, memory_type, min_authority = params
+        vec_rows = [rows[batch[pos][0]] for pos in positions]
+        searched = idx.search_vectors(
+            query_vecs[vec_rows], n=top_k, memory_type=memory_type, min_authority=min_authority
+        )
+        for pos, row, hits in zip(positions, vec_rows, searched):
+            results[pos] = [
+                {
+                    "id": r.memory_id,
+                    "type": r.memory_type,
+                    "content": r.content,
+                    "score": r.score,
+                    "authority": r.authority,
+                    "tags": r.tags,
+                }
+                for r in hits
+            ]
+            semantic_cache.put(query_vecs[row:row + 1], params, results[pos])
+    
+    return results
+
+
+class SearchBatcher:
+    """Micro-batches searches from concurrent tool calls (flush on size or timeout)."""
+    
+    def __init__(self, batch_size: int = SEARCH_BATCH_SIZE, max_wait: float = SEARCH_BATCH_WAIT):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue = None
+        self._worker = None
+    
+    async def submit(self, query: str, params: tuple) -> list:
+        """Queue one search and wait for its batch to complete."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, params, future))
+        return await future
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                results = await asyncio.to_thread(run_search_batch, [(q, p) for q, p, _ in batch])
+            except SystemExit:  # index.load_index exits when the index is missing
+                error = FileNotFoundError("Memory index not found")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+search_batcher = SearchBatcher()
+
+
+async def cached_search(
+    query: str,
+    top_k: int,
+    memory_type: Optional[str] = None,
+    min_authority: int = 0,
+) -> list:
+    """Semantic search returning result dicts, served from the caches when possible."""
+    params = (top_k, memory_type, min_authority)
+    key = (query, *params)
+    result_dicts = query_cache.get(key)
+    if result_dicts is not None:
+        return result_dicts
+    
+    result_dicts = await search_batcher.submit(query, params)
+    query_cache.put(key, result_dicts)
+    return result_dicts
 
 
 def format_results_markdown(results: list) -> str:
@@ -168,16 +350,19 @@ def format_results_markdown(results: list) -> str:
     if not results:
         return "No relevant memories found."
     
-    lines = []
+    buf = io.StringIO()
+    write = buf.write
     for i, r in enumerate(results, 1):
-        score_bar = "█" * int(r["score"] * 10) + "░" * (10 - int(r["score"] * 10))
-        lines.append(f"**{i}. [{r['type']}]** (auth:{r['authority']}, score:{r['score']:.2f} {score_bar})")
-        lines.append(f"   {r['content'][:200]}{'...' if len(r['content']) > 200 else ''}")
+        score = r["score"]
+        content = r["content"]
+        score_bar = _BARS[min(max(int(score * 10), 0), 10)]
+        write(f"**{i}. [{r['type']}]** (auth:{r['authority']}, score:{score:.2f} {score_bar})\n")
+        write(f"   {content[:200]}{'...' if len(content) > 200 else ''}\n")
         if r.get("tags"):
-            lines.append(f"   _tags: {', '.join(r['tags'])}_")
-        lines.append("")
+            write(f"   _tags: {', '.join(r['tags'])}_\n")
+        write("\n")
     
-    return "\n".join(lines)
+    return buf.getvalue()[:-1]
 
 
 def format_context_block(results: list, max_chars: int) -> str:
@@ -186,22 +371,22 @@ def format_context_block(results: list, max_chars: int) -> str:
         return ""
     
     # Sort by authority (highest first), then score
-    sorted_results = sorted(results, key=lambda r: (-r["authority"], -r["score"]))
+    sorted_results = sorted(results, key=_CONTEXT_SORT_KEY, reverse=True)
     
-    lines = ["<relevant_memories>"]
-    total_chars = 0
+    # Keep the longest prefix whose entries fit in max_chars; only those
+    # get their content copied into the block
+    headers = [f"[{r['type']}|auth:{r['authority']}|score:{r['score']:.2f}] " for r in sorted_results]
+    ends = list(accumulate(len(h) + len(r["content"]) for h, r in zip(headers, sorted_results)))
+    cutoff = bisect.bisect_right(ends, max_chars)
     
-    for r in sorted_results:
-        entry = f"[{r['type']}|auth:{r['authority']}|score:{r['score']:.2f}] {r['content']}"
-        
-        if total_chars + len(entry) > max_chars:
-            break
-        
-        lines.append(entry)
-        total_chars += len(entry)
-    
-    lines.append("</relevant_memories>")
-    return "\n".join(lines)
+    buf = io.StringIO()
+    buf.write("<relevant_memories>\n")
+    for header, r in zip(headers[:cutoff], sorted_results):
+        buf.write(header)
+        buf.write(r["content"])
+        buf.write("\n")
+    buf.write("</relevant_memories>")
+    return buf.getvalue()
 
 
 # ============================================================================
@@ -236,28 +421,8 @@ async def memory_recall(params: RecallInput) -> str:
         Markdown-formatted list of relevant memories with scores and metadata
     """
     try:
-        idx = load_index_module()
-        
-        results = idx.search(
-            params.query,
-            n=params.top_k,
-            memory_type=params.memory_type.value if params.memory_type else None,
-            min_authority=params.min_authority
-        )
-        
-        # Convert to dicts
-        result_dicts = [
-            {
-                "id": r.memory_id,
-                "type": r.memory_type,
-                "content": r.content,
-                "score": r.score,
-                "authority": r.authority,
-                "tags": r.tags,
-            }
-            for r in results
-        ]
-        
+        memory_type = params.memory_type.value if params.memory_type else None
+        result_dicts = await cached_search(params.query, params.top_k, memory_type, params.min_authority)
         return format_results_markdown(result_dicts)
     
     except FileNotFoundError:
@@ -299,17 +464,8 @@ async def memory_remember(params: RememberInput) -> str:
         Confirmation with memory ID and rebuild status
     """
     try:
-        # Load existing memories
-        if MEMORY_PATH.exists():
-            with open(MEMORY_PATH) as f:
-                store = json.load(f)
-        else:
-            store = {"memories": [], "schema_version": "1.0"}
-        
-        memories = store.get("memories", [])
-        
         # Generate unique ID
-        mem_id = f"mem-{hashlib.sha256(f'{params.content}{time.time()}'.encode()).hexdigest()[:12]}"
+        mem_id = f"mem-{secrets.token_hex(6)}"
         
         # Build memory object
         new_mem = {
@@ -328,20 +484,25 @@ async def memory_remember(params: RememberInput) -> str:
         if params.confidence is not None:
             new_mem["confidence"] = params.confidence
         
-        memories.append(new_mem)
-        store["memories"] = memories
-        
         # Save
-        with open(MEMORY_PATH, "w") as f:
-            json.dump(store, f, indent=2)
+        append_memory(new_mem)
         
-        # Trigger index rebuild via HTTP API if running
-        try:
-            import httpx
-            httpx.post("http://localhost:7437/rebuild", timeout=1.0)
-            rebuild_status = "Index rebuild triggered"
-        except Exception:
-            rebuild_status = "Index rebuild pending (run `python3 ~/unified-memory/index.py build`)"
+        # Cached results no longer reflect the store
+        query_cache.clear()
+        semantic_cache.clear()
+        
+        # Add to the live index via HTTP API if running (embeds just this memory)
+        rebuild_status = "Index rebuild pending (run `python3 ~/unified-memory/index.py build`)"
+        if _http is not None:
+            try:
+                response = _http.post("/add", json=new_mem)
+                if response.status_code == 200:
+                    rebuild_status = "Index updated"
+                else:
+                    _http.post("/rebuild")
+                    rebuild_status = "Index rebuild triggered"
+            except Exception:
+                pass
         
         authority = get_authority(params.memory_type.value)
         
@@ -382,21 +543,7 @@ async def memory_context(params: ContextInput) -> str:
         XML-formatted context block with relevant memories
     """
     try:
-        idx = load_index_module()
-        
-        results = idx.search(params.query, n=10)
-        
-        result_dicts = [
-            {
-                "id": r.memory_id,
-                "type": r.memory_type,
-                "content": r.content,
-                "score": r.score,
-                "authority": r.authority,
-                "tags": r.tags,
-            }
-            for r in results
-        ]
+        result_dicts = await cached_search(params.query, 10)
         
         # Rough token to char estimate (4 chars per token)
         max_chars = params.max_tokens * 4
@@ -431,19 +578,14 @@ async def memory_stats() -> str:
         Markdown-formatted statistics
     """
     try:
-        if not MEMORY_PATH.exists():
+        if not MEMORY_PATH.exists() and not MEMORY_JOURNAL_PATH.exists():
             return "No memories found. Memory system not initialized."
         
-        with open(MEMORY_PATH) as f:
-            store = json.load(f)
-        
+        store = load_store()
         memories = store.get("memories", [])
         
         # Count by type
-        types = {}
-        for mem in memories:
-            t = mem.get("type", "unknown")
-            types[t] = types.get(t, 0) + 1
+        types = Counter(mem.get("type", "unknown") for mem in memories)
         
         # Check index status
         index_exists = (INDEX_DIR / "faiss.index").exists()
@@ -459,15 +601,14 @@ async def memory_stats() -> str:
             ""
         ]
         
-        for t in ["constraint", "decision", "procedure", "goal", "lesson", "preference", "observation", "hypothesis"]:
+        for t in _KNOWN_TYPES:
             if t in types:
-                auth = get_authority(t)
+                auth = _AUTHORITY[t]
                 lines.append(f"- **{t}** (auth:{auth}): {types[t]}")
         
         # Any unknown types
-        for t, count in sorted(types.items()):
-            if t not in ["constraint", "decision", "procedure", "goal", "lesson", "preference", "observation", "hypothesis"]:
-                lines.append(f"- {t}: {count}")
+        for t in sorted(types.keys() - set(_KNOWN_TYPES)):
+            lines.append(f"- {t}: {types[t]}")
         
         return "\n".join(lines)
     
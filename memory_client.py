@@ -15,20 +15,85 @@ Usage:
     remember("Learned that X causes Y", type="lesson", tags=["debugging"])
 """
 
-import json
-import urllib.request
+import atexit
+import http.client
+import threading
+import time
 from pathlib import Path
 from typing import List, Optional, Dict
 
-API_URL = "http://localhost:7437"
+from store_io import json_loads as _json_loads, json_dumps as _json_dumps, append_journal
+
+API_HOST = "localhost"
+API_PORT = 7437
+API_URL = f"http://{API_HOST}:{API_PORT}"
+API_PROBE_TTL = 5.0  # seconds to trust the last availability check
+
+# Persistent connections to the API server, one per thread (HTTPConnection
+# is not thread-safe), reopened on demand
+_local = threading.local()
+
+# (monotonic time, available) of the last health probe or API call
+_last_probe = (0.0, False)
+
+def _connection() -> http.client.HTTPConnection:
+    """This thread's connection to the API server"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = http.client.HTTPConnection(API_HOST, API_PORT)
+        atexit.register(conn.close)
+    return conn
+
+def _request(method: str, path: str, data: bytes = None, timeout: float = 10, idempotent: bool = True) -> bytes:
+    """
+    Send a request over this thread's connection and return the response body.
+    
+    A request the server dropped before it was fully sent is retried once on
+    a new connection. After that only idempotent requests are: the server
+    may already have applied a /write whose response was lost.
+    """
+    global _last_probe
+    conn = _connection()
+    headers = {"Content-Type": "application/json"} if data is not None else {}
+    for attempt in range(2):
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        sent = False
+        try:
+            conn.request(method, path, body=data, headers=headers)
+            sent = True
+            resp = conn.getresponse()
+            body = resp.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # Server dropped an idle keep-alive connection - reconnect once
+            conn.close()
+            if attempt or (sent and not idempotent):
+                _last_probe = (0.0, False)
+                raise
+            continue
+        except Exception:
+            conn.close()
+            _last_probe = (0.0, False)
+            raise
+        
+        _last_probe = (time.monotonic(), True)
+        if resp.status != 200:
+            raise http.client.HTTPException(f"{method} {path} failed ({resp.status}): {body[:200]!r}")
+        return body
 
 def _api_available() -> bool:
-    """Check if API server is running"""
+    """Check if API server is running (result cached for API_PROBE_TTL seconds)"""
+    global _last_probe
+    probed_at, available = _last_probe
+    if time.monotonic() - probed_at < API_PROBE_TTL:
+        return available
+    
     try:
-        req = urllib.request.Request(f"{API_URL}/health")
-        with urllib.request.urlopen(req, timeout=1) as resp:
-            return resp.status == 200
-    except:
+        _request("GET", "/health", timeout=1)
+        return True
+    except Exception:
+        _last_probe = (time.monotonic(), False)
         return False
 
 def _local_search(query: str, n: int = 5, memory_type: str = None) -> str:
@@ -60,21 +125,14 @@ def recall(
     """
     if _api_available():
         endpoint = "/search" if raw else "/context"
-        data = json.dumps({
+        data = _json_dumps({
             "query": query,
             "n": n,
             "type": memory_type,
             "max_tokens": max_tokens,
-        }).encode()
+        })
         
-        req = urllib.request.Request(
-            f"{API_URL}{endpoint}",
-            data=data,
-            headers={"Content-Type": "application/json"},
-        )
-        
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            result = json.loads(resp.read())
+        result = _json_loads(_request("POST", endpoint, data, timeout=30))
         
         return result.get("results", []) if raw else result.get("context", "")
     
@@ -105,36 +163,24 @@ def remember(
         Dict with id and status
     """
     if _api_available():
-        data = json.dumps({
+        data = _json_dumps({
             "content": content,
             "type": type,
             "tags": tags or [],
             "source": source,
             "rationale": rationale,
             "confidence": confidence,
-        }).encode()
-        
-        req = urllib.request.Request(
-            f"{API_URL}/write",
-            data=data,
-            headers={"Content-Type": "application/json"},
-        )
+        })
         
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            return json.loads(resp.read())
+        return _json_loads(_request("POST", "/write", data, timeout=10, idempotent=False))
     
     else:
-        # Direct file write
+        # Append to the journal: server.py and the other writers fold it into
+        # memories.json under the store lock, so nothing they compact is lost
         mem_path = Path.home() / "unified-memory" / "memories.json"
         
-        with open(mem_path) as f:
-            store = json.load(f)
-        
-        memories = store.get("memories", [])
-        
-        import hashlib
-        import time
-        mem_id = f"mem-{hashlib.sha256(f'{content}{time.time()}'.encode()).hexdigest()[:8]}"
+        import secrets
+        mem_id = f"mem-{secrets.token_hex(4)}"
         
         new_mem = {
             "id": mem_id,
@@ -152,11 +198,7 @@ def remember(
         if confidence is not None:
             new_mem["confidence"] = confidence
         
-        memories.append(new_mem)
-        store["memories"] = memories
-        
-        with open(mem_path, "w") as f:
-            json.dump(store, f, indent=2)
+        append_journal(mem_path.with_suffix(".jsonl"), _json_dumps(new_mem) + b"\n")
         
         return {"id": mem_id, "status": "created"}
 
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Query Result Cache
+
+Thread-safe caches for search results. Repeated (QueryCache) or
+paraphrased (SemanticQueryCache) queries are served from memory
+instead of re-running the embedding model and FAISS search.
+
+Usage:
+    from query_cache import QueryCache, SemanticQueryCache
+
+    cache = QueryCache(max_size=2000, ttl_seconds=300)
+    results = cache.get(key)
+    if results is None:
+        results = run_search(...)
+        cache.put(key, results)
+
+    cache.clear()  # after writes
+
+    semantic = SemanticQueryCache(threshold=0.92)
+    results = semantic.get(query_vec, params)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class QueryCache:
+    """LRU + TTL cache. Keys must be hashable (e.g. tuples of query params)."""
+
+    def __init__(self, max_size: int = 2000, ttl_seconds: float = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return cached value, or None if missing/expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries (call after the underlying data changes)."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SemanticQueryCache:
+    """
+    Cache keyed on query embeddings rather than exact strings.
+
+    Paraphrased queries embed to nearby vectors and usually retrieve the
+    same memories, so a lookup returns the cached results of any earlier
+    query with cosine similarity >= threshold and identical search params.
+    Vectors must be L2-normalized float32 arrays of shape (1, dim).
+    Entries are evicted FIFO once max_size is reached.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_size: int = 1024,
+                 ttl_seconds: float = 300, probe: int = 8):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.probe = probe  # nearest cached queries checked per lookup
+        self._index = None  # faiss.IndexIDMap(IndexFlatIP), built on first put
+        self._entries: "OrderedDict[int, tuple[float, Hashable, Any]]" = OrderedDict()  # id -> (expires_at, params, value)
+        self._next_id = 0
+        self._lock = threading.RLock()
+
+    def get(self, vec, params: Hashable) -> Optional[Any]:
+        """Return results cached for a similar query with the same params, or None."""
+        with self._lock:
+            if not self._entries:
+                return None
+
+            sims, ids = self._index.search(vec, min(self.probe, len(self._entries)))
+            now = time.monotonic()
+            for sim, entry_id in zip(sims[0], ids[0]):
+                if entry_id < 0 or sim < self.threshold:
+                    break
+                expires_at, entry_params, value = self._entries[int(entry_id)]
+                if entry_params == params and expires_at >= now:
+                    return value
+            return None
+
+    def put(self, vec, params: Hashable, value: Any) -> None:
+        """Cache value for this query vector and params."""
+        import numpy as np
+
+        with self._lock:
+            if self._index is None:
+                import faiss
+                self._index = faiss.IndexIDMap(faiss.IndexFlatIP(vec.shape[1]))
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vec, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = (time.monotonic() + self.ttl_seconds, params, value)
+
+            while len(self._entries) > self.max_size:
+                oldest_id, _ = self._entries.popitem(last=False)
+                self._index.remove_ids(np.array([oldest_id], dtype=np.int64))
+
+    def clear(self) -> None:
+        """Drop all entries (call after the underlying data changes)."""
+        with self._lock:
+            if self._index is not None:
+                self._index.reset()
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -7,20 +7,64 @@ Used by both Claude (via MCP filesystem) and Origin OS agents.
 
 Storage locations:
   - Local: ~/unified-memory/memories.json
+           ~/unified-memory/memories.jsonl (memories added since the last full save)
+           ~/unified-memory/session.json (session checkpoint state)
+           ~/unified-memory/session.wal (session updates since the last session save)
+           ~/unified-memory/history.jsonl (archived tasks beyond SESSION_HISTORY_LIMIT)
   - GitHub: <repo>/memories.json (synced separately)
+  - Redis: session state only, when UNIFIED_MEMORY_SESSION_BACKEND=redis
 """
 
+import contextlib
 import json
 import os
-import hashlib
-from datetime import datetime, timezone
+import time
+import operator
+import re
+import secrets
+import sys
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import repeat
 from pathlib import Path
-from typing import Optional, List, Literal
+from typing import Iterator, Optional, List, Literal
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # store_io lives at the repo root
+from store_io import (
+    json_loads as _json_loads,
+    json_dumps as _json_dumps,
+    load_json_mmap as _load_json_mmap,
+    load_journal as _load_journal,
+    merge_journal,
+    append_journal,
+    save_store,
+    journal_lock,
+)
+
+try:
+    import numpy as np  # vectorized filtering in get_memories
+except ImportError:
+    np = None
+
+try:
+    import redis  # optional shared session backend (UNIFIED_MEMORY_SESSION_BACKEND=redis)
+except ImportError:
+    redis = None
 
 # Default paths
 DEFAULT_LOCAL_PATH = Path.home() / "unified-memory" / "memories.json"
 MEMORY_DIR = Path.home() / "unified-memory"
 
+SESSION_WAL_COMPACT_BYTES = 64 * 1024  # fold the session log into session.json above this size
+SESSION_HISTORY_LIMIT = 200  # archived tasks kept in session state; older ones go to history.jsonl
+
+# "json": session.json + session.wal next to the store (single machine)
+# "redis": shared session state for agents on several processes/hosts
+SESSION_BACKEND = os.environ.get("UNIFIED_MEMORY_SESSION_BACKEND", "json")
+SESSION_REDIS_URL = os.environ.get("UNIFIED_MEMORY_REDIS_URL", "redis://localhost:6379/0")
+SESSION_REDIS_PREFIX = "unified-memory:session"
+
 MemoryType = Literal[
     "preference", "decision", "constraint", "goal",
     "procedure", "lesson", "observation", "hypothesis"
@@ -40,10 +84,14 @@ TYPE_METADATA = {
     "hypothesis": {"authority": 0, "requires_rationale": False, "requires_confidence": True, "expires": True},
 }
 
+# Flat type -> authority lookup (avoids the nested TYPE_METADATA access per row)
+_AUTHORITY = {t: meta["authority"] for t, meta in TYPE_METADATA.items()}
+_get_type = operator.itemgetter("type")
+
 
-def generate_id(content: str) -> str:
-    """Generate 8-char hex ID from content hash."""
-    return hashlib.sha256(content.encode()).hexdigest()[:8]
+def generate_id() -> str:
+    """Generate random 8-char hex ID."""
+    return secrets.token_hex(4)
 
 
 def now_iso() -> str:
@@ -51,23 +99,143 @@ def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def load_memories(path: Path = DEFAULT_LOCAL_PATH) -> dict:
-    """Load memory store from disk."""
+def journal_path(path: Path = DEFAULT_LOCAL_PATH) -> Path:
+    """Append-only journal that sits next to the memory store."""
+    return path.with_suffix(".jsonl")
+
+
+def load_journal(path: Path = DEFAULT_LOCAL_PATH) -> Iterator[dict]:
+    """Yield memories appended since the last full save."""
+    return _load_journal(journal_path(path))
+
+
+def session_path(path: Path = DEFAULT_LOCAL_PATH) -> Path:
+    """Session state sidecar, kept apart from the (much larger) memory store."""
+    return path.with_name("session.json")
+
+
+def session_wal_path(path: Path = DEFAULT_LOCAL_PATH) -> Path:
+    """Append-only session log that sits next to the session sidecar."""
+    return session_path(path).with_suffix(".wal")
+
+
+def history_path(path: Path = DEFAULT_LOCAL_PATH) -> Path:
+    """Append-only archive of tasks that aged out of the session history."""
+    return path.with_name("history.jsonl")
+
+
+def _spill_history(tasks: List[dict], path: Path = DEFAULT_LOCAL_PATH) -> None:
+    """Append archived tasks (oldest first) to history.jsonl in one write."""
+    if tasks:
+        with open(history_path(path), "ab") as f:
+            f.write(b"".join(_json_dumps(task) + b"\n" for task in tasks))
+
+
+def load_session_wal(path: Path = DEFAULT_LOCAL_PATH) -> Iterator[dict]:
+    """Yield session operations logged since the last session save."""
+    wpath = session_wal_path(path)
+    if not wpath.exists():
+        return
+    with open(wpath, "rb") as f:
+        for line in f:
+            try:
+                yield _json_loads(line)
+            except json.JSONDecodeError:
+                continue  # torn write at the tail
+
+
+def load_memories_readonly(path: Path = DEFAULT_LOCAL_PATH) -> dict:
+    """
+    Load memory store from disk (snapshot + journal) without writing anything.
+    
+    The snapshot is parsed from a read-only mmap; a legacy session_log is
+    left in place rather than migrated. For status and other read paths.
+    """
     if not path.exists():
-        return {"version": "1.0.0", "last_sync": None, "memories": []}
-    with open(path, "r") as f:
-        return json.load(f)
+        store = {"version": "1.0.0", "last_sync": None, "memories": []}
+    else:
+        store = _load_json_mmap(path)
+    
+    merge_journal(store["memories"], journal_path(path))
+    return store
+
+
+def load_memories(path: Path = DEFAULT_LOCAL_PATH) -> dict:
+    """Load memory store from disk (snapshot + journal)."""
+    store = load_memories_readonly(path)
+    if "session_log" in store:  # written before session.json existed
+        _migrate_session_log(store, path)
+    return store
+
+
+# directory -> open fd, reused to fsync directory entries after renames/creates
+_DIR_FDS: dict = {}
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Persist directory entries (a rename or new file) in directory."""
+    if not hasattr(os, "O_DIRECTORY"):  # Windows: no directory fds, NTFS journals renames
+        return
+    key = str(directory)
+    fd = _DIR_FDS.get(key)
+    if fd is not None and os.fstat(fd).st_ino != os.stat(key).st_ino:
+        os.close(fd)  # directory was replaced since we opened it
+        fd = None
+    if fd is None:
+        fd = _DIR_FDS[key] = os.open(key, os.O_RDONLY | os.O_DIRECTORY)
+    os.fsync(fd)
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """
+    Durably replace path with data: one buffer written to a temp file,
+    fsync, rename, then fsync the directory so the rename survives a crash.
+    Readers never see a partial or truncated file.
+    """
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
+    _fsync_dir(path.parent)
+
+
+def _write_snapshot(store: dict, path: Path) -> None:
+    # Kept indented: memories.json is synced through git and merged line by line
+    _write_atomic(path, _json_dumps(store, indent=True))
+
+
+def _write_store(store: dict, path: Path) -> None:
+    store["last_sync"] = now_iso()
+    _write_snapshot(store, path)
 
 
 def save_memories(store: dict, path: Path = DEFAULT_LOCAL_PATH) -> None:
-    """Save memory store to disk."""
+    """
+    Save memory store to disk. The journal is folded in and removed;
+    memories other processes added since store was loaded are kept.
+    """
     path.parent.mkdir(parents=True, exist_ok=True)
-    store["last_sync"] = now_iso()
-    with open(path, "w") as f:
-        json.dump(store, f, indent=2)
+    save_store(store, path, journal_path(path), save=_write_store)
 
 
-def add_memory(
+def append_memory(memory: dict, path: Path = DEFAULT_LOCAL_PATH) -> None:
+    """Append a single memory to the journal without rewriting the store."""
+    append_journal(journal_path(path), _json_dumps(memory) + b"\n")
+
+
+def compact_journal(path: Path = DEFAULT_LOCAL_PATH) -> None:
+    """Fold journaled memories into the main store file."""
+    if journal_path(path).exists():
+        save_memories(load_memories(path), path)
+
+
+def _new_memory(
     content: str,
     memory_type: MemoryType,
     source: SourceType,
@@ -80,13 +248,8 @@ def add_memory(
     conversation_id: Optional[str] = None,
     supersedes: Optional[str] = None,
     promoted_from: Optional[str] = None,
-    path: Path = DEFAULT_LOCAL_PATH,
 ) -> dict:
-    """
-    Add a new memory to the store.
-    
-    Returns the created memory object.
-    """
+    """Validate and build a new memory object (not yet stored)."""
     meta = TYPE_METADATA[memory_type]
     
     # Validate required fields
@@ -96,7 +259,7 @@ def add_memory(
         raise ValueError(f"{memory_type} requires confidence score")
     
     memory = {
-        "id": generate_id(content + now_iso()),
+        "id": generate_id(),
         "type": memory_type,
         "content": content,
         "tags": tags or [],
@@ -121,13 +284,251 @@ def add_memory(
     if promoted_from:
         memory["promoted_from"] = promoted_from
     
-    store = load_memories(path)
-    store["memories"].append(memory)
-    save_memories(store, path)
+    return memory
+
+
+def add_memory(
+    content: str,
+    memory_type: MemoryType,
+    source: SourceType,
+    rationale: Optional[str] = None,
+    confidence: Optional[float] = None,
+    tags: Optional[List[str]] = None,
+    context: Optional[str] = None,
+    expires_at: Optional[str] = None,
+    agent_id: Optional[str] = None,
+    conversation_id: Optional[str] = None,
+    supersedes: Optional[str] = None,
+    promoted_from: Optional[str] = None,
+    path: Path = DEFAULT_LOCAL_PATH,
+) -> dict:
+    """
+    Add a new memory to the store.
+    
+    Returns the created memory object.
+    """
+    memory = _new_memory(
+        content, memory_type, source,
+        rationale=rationale,
+        confidence=confidence,
+        tags=tags,
+        context=context,
+        expires_at=expires_at,
+        agent_id=agent_id,
+        conversation_id=conversation_id,
+        supersedes=supersedes,
+        promoted_from=promoted_from,
+    )
+    append_memory(memory, path)
     
     return memory
 
 
+def add_memory_deferred(store: dict, content: str, memory_type: MemoryType, source: SourceType, **fields) -> dict:
+    """
+    Add a new memory to an already loaded store without touching disk.
+    
+    For bulk imports: load_memories() once, add each entry, then
+    save_memories() once. Accepts the same fields as add_memory (except path).
+    """
+    memory = _new_memory(content, memory_type, source, **fields)
+    store["memories"].append(memory)
+    return memory
+
+
+class _StoreProxy:
+    """Loaded store handed out by memory_store(); add() never touches disk."""
+    
+    def __init__(self, store: dict):
+        self.store = store
+        self.added = 0
+    
+    def add(self, content: str, memory_type: MemoryType, source: SourceType, **fields) -> dict:
+        """Same as add_memory (except path), kept in memory until the block exits."""
+        memory = add_memory_deferred(self.store, content, memory_type, source, **fields)
+        self.added += 1
+        return memory
+
+
+@contextlib.contextmanager
+def memory_store(path: Path = DEFAULT_LOCAL_PATH) -> Iterator[_StoreProxy]:
+    """
+    Hold the store open for a batch of adds and save it once on exit.
+    
+        with memory_store() as store:
+            for entry in entries:
+                store.add(entry, "observation", "agent")
+    
+    Nothing is written if no memories were added or the block raised.
+    """
+    proxy = _StoreProxy(load_memories(path))
+    yield proxy
+    if proxy.added:
+        save_memories(proxy.store, path)
+
+
+# path -> (file stamp, columns) for get_memories
+_COLUMNS_CACHE: dict = {}
+
+# path -> (file stamp, inverted index) for search_memories
+_INVERTED_CACHE: dict = {}
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Longest n-gram indexed per token; query words are matched to tokens through these
+_GRAM_SIZE = 3
+
+# (path, context, file stamp) -> (valid until ns, summary) for get_context_summary
+_SUMMARY_CACHE: dict = {}
+SUMMARY_CACHE_SIZE = 16
+
+
+def _store_stamp(path: Path) -> tuple:
+    """Change marker for the store and its journal (mtime + size)."""
+    stamp = []
+    for p in (path, journal_path(path)):
+        try:
+            st = p.stat()
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+NEVER_EXPIRES_NS = 2**63 - 1
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+@lru_cache(maxsize=4096)
+def _expiry_ns(expires_at: Optional[str]) -> int:
+    """Epoch nanoseconds for an ISO expiry (parsed once per distinct string)."""
+    if not expires_at:
+        return NEVER_EXPIRES_NS
+    exp = datetime.fromisoformat(expires_at.replace("Z", "+00:00"))
+    if exp.tzinfo is None:
+        exp = exp.replace(tzinfo=timezone.utc)
+    return min((exp - _EPOCH) // timedelta(microseconds=1) * 1_000, NEVER_EXPIRES_NS)
+
+
+def _sort_by_authority(memories: List[dict]) -> List[dict]:
+    """Stable sort, highest authority first, using only C-level key callables."""
+    auth = list(map(_AUTHORITY.get, map(_get_type, memories), repeat(0)))  # custom types rank lowest
+    order = sorted(range(len(memories)), key=auth.__getitem__, reverse=True)
+    return [memories[i] for i in order]
+
+
+def _memory_columns(path: Path) -> dict:
+    """
+    Columnar view of the store for vectorized filtering.
+    
+    Rows are pre-sorted by authority (highest first) and the view is rebuilt
+    only when the store or journal changes on disk.
+    """
+    stamp = _store_stamp(path)
+    cached = _COLUMNS_CACHE.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    
+    store = load_memories_readonly(path)
+    memories = _sort_by_authority(store["memories"])
+    columns = {
+        "last_sync": store.get("last_sync", "never"),
+        "memories": memories,
+        "type": np.array([m["type"] for m in memories], dtype=str),
+        "source": np.array([m.get("provenance", {}).get("source", "") for m in memories], dtype=str),
+        "context": np.array([m.get("context") or "" for m in memories], dtype=str),
+        "expires": np.fromiter((_expiry_ns(m.get("expires_at")) for m in memories), dtype=np.int64, count=len(memories)),
+        "tagset": [frozenset(m.get("tags", ())) for m in memories],
+    }
+    _COLUMNS_CACHE[path] = (stamp, columns)
+    return columns
+
+
+def _inverted_index(path: Path) -> dict:
+    """
+    Token -> row positions over lowered content and tags, for search_memories.
+    
+    Rows are pre-sorted by authority and lowered text is cached alongside,
+    so queries never re-lower the store. Each token's 1- to 3-grams map back
+    to it, so query words find the tokens containing them without a scan of
+    the vocabulary. Rebuilt when the store changes.
+    """
+    stamp = _store_stamp(path)
+    cached = _INVERTED_CACHE.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    
+    memories = _sort_by_authority(load_memories_readonly(path)["memories"])
+    content_lower = []
+    tags_lower = []
+    postings: dict = {}
+    for pos, mem in enumerate(memories):
+        content = mem.get("content", "").lower()
+        tags = [t.lower() for t in mem.get("tags", [])]
+        content_lower.append(content)
+        tags_lower.append(tags)
+        for token in set(_TOKEN_RE.findall(" ".join([content, *tags]))):
+            postings.setdefault(token, set()).add(pos)
+    
+    grams: dict = {}
+    for token in postings:
+        for n in range(1, _GRAM_SIZE + 1):
+            for i in range(len(token) - n + 1):
+                grams.setdefault(token[i:i + n], set()).add(token)
+    
+    inverted = {
+        "memories": memories,
+        "content_lower": content_lower,
+        "tags_lower": tags_lower,
+        "postings": postings,
+        "grams": grams,
+    }
+    _INVERTED_CACHE[path] = (stamp, inverted)
+    return inverted
+
+
+def _tokens_containing(grams: dict, word: str) -> set:
+    """Indexed tokens that contain word, found through their n-grams"""
+    if len(word) <= _GRAM_SIZE:
+        return grams.get(word, set())
+    
+    # Tokens holding every n-gram of word, smallest posting first, then verified
+    gram_tokens = sorted(
+        (grams.get(word[i:i + _GRAM_SIZE], set()) for i in range(len(word) - _GRAM_SIZE + 1)),
+        key=len,
+    )
+    tokens = set(gram_tokens[0])
+    for other in gram_tokens[1:]:
+        if not tokens:
+            break
+        tokens &= other
+    return {token for token in tokens if word in token}
+
+
+def _search_candidates(inverted: dict, query_lower: str) -> Optional[set]:
+    """
+    Rows that may contain query_lower as a substring, or None to scan all.
+    
+    Each word in the query lies inside some word of any matching text, so
+    the candidates are the rows holding, for every query word, a token that
+    contains it. Callers still verify the substring match.
+    """
+    words = _TOKEN_RE.findall(query_lower)
+    if not words:
+        return None
+    
+    postings = inverted["postings"]
+    candidates = None
+    for word in set(words):
+        rows = set()
+        for token in _tokens_containing(inverted["grams"], word):
+            rows |= postings[token]
+        candidates = rows if candidates is None else candidates & rows
+        if not candidates:
+            break
+    return candidates
+
+
 def get_memories(
     memory_type: Optional[MemoryType] = None,
     source: Optional[SourceType] = None,
@@ -141,8 +542,29 @@ def get_memories(
     
     Returns list of matching memories, sorted by authority (highest first).
     """
-    store = load_memories(path)
-    now = datetime.now(timezone.utc)
+    if np is not None:
+        cols = _memory_columns(path)
+        mask = np.ones(len(cols["memories"]), dtype=bool)
+        if memory_type:
+            mask &= cols["type"] == memory_type
+        if source:
+            mask &= cols["source"] == source
+        if context:
+            mask &= cols["context"] == context
+        if not include_expired:
+            mask &= cols["expires"] >= time.time_ns()
+        
+        memories = cols["memories"]
+        rows = np.flatnonzero(mask)
+        if tags:
+            tag_filter = frozenset(tags)
+            tagsets = cols["tagset"]
+            return [memories[i] for i in rows if tagsets[i] & tag_filter]
+        return [memories[i] for i in rows]
+    
+    store = load_memories_readonly(path)
+    now_ns = time.time_ns()
+    tag_filter = frozenset(tags) if tags else None
     
     results = []
     for mem in store["memories"]:
@@ -153,23 +575,19 @@ def get_memories(
         if source and mem["provenance"]["source"] != source:
             continue
         # Filter by tags (any match)
-        if tags and not any(t in mem.get("tags", []) for t in tags):
+        if tag_filter and tag_filter.isdisjoint(mem.get("tags", ())):
             continue
         # Filter by context
         if context and mem.get("context") != context:
             continue
         # Filter expired
-        if not include_expired and mem.get("expires_at"):
-            exp = datetime.fromisoformat(mem["expires_at"].replace("Z", "+00:00"))
-            if exp < now:
-                continue
+        if not include_expired and _expiry_ns(mem.get("expires_at")) < now_ns:
+            continue
         
         results.append(mem)
     
     # Sort by authority (highest first)
-    results.sort(key=lambda m: TYPE_METADATA[m["type"]]["authority"], reverse=True)
-    
-    return results
+    return _sort_by_authority(results)
 
 
 def search_memories(
@@ -183,39 +601,64 @@ def search_memories(
     
     Simple keyword matching - returns memories where content contains query.
     """
-    store = load_memories(path)
+    inverted = _inverted_index(path)
+    memories = inverted["memories"]
     query_lower = query.lower()
     
+    rows = _search_candidates(inverted, query_lower) if query else None
+    rows = range(len(memories)) if rows is None else sorted(rows)
+    
+    # Rows are already in authority order (highest first)
     results = []
-    for mem in store["memories"]:
+    for pos in rows:
+        mem = memories[pos]
         # Filter by type
         if memory_type and mem["type"] != memory_type:
             continue
         # Filter by query (case-insensitive content search)
-        if query and query_lower not in mem.get("content", "").lower():
+        if query and query_lower not in inverted["content_lower"][pos]:
             # Also check tags
-            if not any(query_lower in t.lower() for t in mem.get("tags", [])):
+            if not any(query_lower in t for t in inverted["tags_lower"][pos]):
                 continue
         results.append(mem)
+        if len(results) >= limit:
+            break
     
-    # Sort by authority (highest first)
-    results.sort(key=lambda m: TYPE_METADATA[m["type"]]["authority"], reverse=True)
-    
-    return results[:limit]
+    return results
 
 
 def get_context_summary(context: Optional[str] = None, path: Path = DEFAULT_LOCAL_PATH) -> str:
     """
     Generate a human-readable summary for Claude to read at conversation start.
     
-    Groups memories by type and formats for easy consumption.
+    Groups memories by type and formats for easy consumption. Cached until
+    the store changes or the next listed memory expires.
     """
-    memories = get_memories(context=context, path=path)
+    key = (path, context, _store_stamp(path))
+    cached = _SUMMARY_CACHE.get(key)
+    if cached and time.time_ns() < cached[0]:
+        return cached[1]
     
+    memories = get_memories(context=context, path=path)
+    if np is not None:
+        last_sync = _memory_columns(path)["last_sync"]  # the view get_memories just used
+    else:
+        last_sync = load_memories_readonly(path).get("last_sync", "never")
+    summary = _format_context_summary(memories, last_sync)
+    
+    valid_until = min((_expiry_ns(m.get("expires_at")) for m in memories), default=NEVER_EXPIRES_NS)
+    _SUMMARY_CACHE[key] = (valid_until, summary)
+    if len(_SUMMARY_CACHE) > SUMMARY_CACHE_SIZE:
+        _SUMMARY_CACHE.pop(next(iter(_SUMMARY_CACHE)))
+    return summary
+
+
+def _format_context_summary(memories: List[dict], last_sync: Optional[str]) -> str:
+    """Markdown body for get_context_summary."""
     if not memories:
         return "No memories stored yet."
     
-    lines = [f"# Unified Memory Summary", f"Last sync: {load_memories(path).get('last_sync', 'never')}", ""]
+    lines = [f"# Unified Memory Summary", f"Last sync: {last_sync}", ""]
     
     # Group by type in authority order
     type_order = ["constraint", "decision", "procedure", "goal", "lesson", "preference", "observation", "hypothesis"]
@@ -326,8 +769,312 @@ def get_session_state(path: Path = DEFAULT_LOCAL_PATH) -> dict:
     
     Returns the active task with steps completed and next steps.
     """
-    store = load_memories(path)
-    return store.get("session_log", {"active_task": None, "history": []})
+    return _session_backend().load(path)
+
+
+def _session_lock(path: Path = DEFAULT_LOCAL_PATH, exclusive: bool = False):
+    """Shared by session log appends and readers, held exclusively while the log is folded."""
+    return journal_lock(session_wal_path(path), exclusive=exclusive)
+
+
+def _sidecar_stamp(path: Path) -> Optional[tuple]:
+    """Change marker for the session sidecar (a fold replaces it)."""
+    try:
+        st = session_path(path).stat()
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def load_session(path: Path = DEFAULT_LOCAL_PATH) -> dict:
+    """
+    Load session state (sidecar + session log) without parsing the memories.
+    
+    Read-only: stores written before the sidecar existed keep session_log
+    inside memories.json, which is read from there here and moved out into
+    the sidecar by the next load_memories.
+    """
+    with _session_lock(path):
+        return _read_session(path)
+
+
+def _read_session(path: Path) -> dict:
+    # Caller holds _session_lock
+    spath = session_path(path)
+    if spath.exists():
+        session = _load_json_mmap(spath)
+    elif path.exists() and (store := _load_json_mmap(path)).get("session_log"):
+        session = store["session_log"]
+    else:
+        session = {"active_task": None, "history": []}
+    
+    for op in load_session_wal(path):
+        _apply_session_op(session, op)
+    return session
+
+
+def _migrate_session_log(store: dict, path: Path) -> None:
+    """Move a legacy session_log out of the memory snapshot into the session sidecar."""
+    session = store.pop("session_log") or {"active_task": None, "history": []}
+    # Sidecar first: if we stop in between, the sidecar wins and the stale copy is dropped next load
+    spath = session_path(path)
+    if not spath.exists():
+        _write_atomic(spath, _json_dumps(session, indent=True))
+    # Under the store lock like any save, so appends compacted meanwhile are kept
+    save_store(store, path, journal_path(path), save=_write_snapshot)
+
+
+def save_session(session: dict, path: Path = DEFAULT_LOCAL_PATH) -> None:
+    """
+    Write the session sidecar; the session log is folded in and removed.
+    Only the last SESSION_HISTORY_LIMIT archived tasks are kept, older
+    ones are appended to history.jsonl so every save stays small.
+    
+    Hold _session_lock exclusively from loading session until this returns
+    (see compact_wal), or operations logged meanwhile are lost.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    history = session.get("history") or []
+    if len(history) > SESSION_HISTORY_LIMIT:
+        _spill_history(history[:-SESSION_HISTORY_LIMIT], path)
+        session["history"] = history[-SESSION_HISTORY_LIMIT:]
+    _write_atomic(session_path(path), _json_dumps(session, indent=True))
+    session_wal_path(path).unlink(missing_ok=True)
+
+
+def _apply_session_op(session: dict, op: dict) -> None:
+    """Apply one logged session operation to the session state in place."""
+    ts = op["ts"]
+    task = session.get("active_task")
+    
+    if op["op"] == "checkpoint":
+        if task:
+            if op.get("step"):
+                task["steps_completed"].append(op["step"])
+            if op.get("next_steps") is not None:
+                task["next_steps"] = op["next_steps"]
+            if op.get("blockers") is not None:
+                task["blockers"] = op["blockers"]
+            if op.get("notes"):
+                task["notes"] = op["notes"]
+    
+    elif op["op"] == "start_task":
+        # Archive current task if exists
+        if task:
+            task["ended"] = ts
+            task["status"] = "interrupted"
+            session["history"].append(task)
+        
+        session["active_task"] = {
+            "name": op["name"],
+            "description": op["description"],
+            "started": ts,
+            "steps_completed": [],
+            "next_steps": op.get("next_steps") or [],
+            "blockers": [],
+        }
+    
+    elif op["op"] == "end_task":
+        if task:
+            task["ended"] = ts
+            task["status"] = op["status"]
+            if op.get("summary"):
+                task["summary"] = op["summary"]
+            session["history"].append(task)
+            session["active_task"] = None
+    
+    session["last_checkpoint"] = ts
+
+
+def _log_session_op(op: dict, path: Path = DEFAULT_LOCAL_PATH) -> dict:
+    """Record a session operation with the configured backend and return the new state."""
+    op["ts"] = now_iso()
+    return _session_backend().log(op, path)
+
+
+def compact_wal(path: Path = DEFAULT_LOCAL_PATH) -> None:
+    """
+    Fold logged session operations into the session sidecar. Appends wait
+    on the lock meanwhile, so each one is either folded in or starts a new log.
+    """
+    if not session_wal_path(path).exists():
+        return
+    with _session_lock(path, exclusive=True):
+        if session_wal_path(path).exists():
+            save_session(_read_session(path), path)
+
+
+class SessionBackend(ABC):
+    """Where session state lives. log() records one operation (see _apply_session_op)."""
+    
+    @abstractmethod
+    def load(self, path: Path) -> dict:
+        """Current session state."""
+    
+    @abstractmethod
+    def log(self, op: dict, path: Path) -> dict:
+        """Apply op durably; returns the session state afterwards."""
+
+
+class JsonSessionBackend(SessionBackend):
+    """session.json sidecar plus an fsynced append-only session.wal."""
+    
+    def load(self, path: Path) -> dict:
+        return load_session(path)
+    
+    def __init__(self):
+        # path -> (sidecar stamp, log size, state): the state after the last logged op
+        self._states: dict = {}
+    
+    def log(self, op: dict, path: Path) -> dict:
+        """
+        Durably append the operation (one write + fsync). The log is folded
+        into the session sidecar once it grows past SESSION_WAL_COMPACT_BYTES.
+        
+        The op is applied to the state left by this process's previous op,
+        unless another process has logged or folded since (then it reloads).
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        line = _json_dumps(op) + b"\n"
+        with _session_lock(path):
+            fd = os.open(session_wal_path(path), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line)
+                os.fsync(fd)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            if size == len(line):  # log was just created: persist its directory entry too
+                _fsync_dir(path.parent)
+            
+            stamp = _sidecar_stamp(path)
+            cached = self._states.get(path)
+            if cached and cached[:2] == (stamp, size - len(line)):
+                session = cached[2]
+                _apply_session_op(session, op)
+            else:
+                session = _read_session(path)
+        
+        if size > SESSION_WAL_COMPACT_BYTES:
+            compact_wal(path)
+            self._states.pop(path, None)
+            return load_session(path)
+        self._states[path] = (stamp, size, session)
+        return session
+
+
+class RedisSessionBackend(SessionBackend):
+    """
+    Session state in Redis, shared by every agent pointed at the same server.
+    
+    <prefix>:active   hash, active task fields (JSON-encoded values)
+    <prefix>:steps    list, steps_completed of the active task (RPUSH per checkpoint)
+    <prefix>:history  list, archived tasks as JSON, newest first (LPUSH),
+                      trimmed to SESSION_HISTORY_LIMIT; the overflow goes to
+                      the local history.jsonl
+    <prefix>:last     last checkpoint timestamp
+    
+    Each operation runs as a WATCH/MULTI transaction, so concurrent agents
+    never interleave half-applied updates. The path argument only locates
+    history.jsonl.
+    """
+    
+    def __init__(self, url: str = SESSION_REDIS_URL, prefix: str = SESSION_REDIS_PREFIX):
+        if redis is None:
+            raise ImportError("UNIFIED_MEMORY_SESSION_BACKEND=redis requires the redis package")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.active_key = f"{prefix}:active"
+        self.steps_key = f"{prefix}:steps"
+        self.history_key = f"{prefix}:history"
+        self.last_key = f"{prefix}:last"
+    
+    def _active_task(self, conn) -> Optional[dict]:
+        fields = conn.hgetall(self.active_key)
+        if not fields:
+            return None
+        task = {k: _json_loads(v) for k, v in fields.items()}
+        task["steps_completed"] = conn.lrange(self.steps_key, 0, -1)
+        return task
+    
+    def load(self, path: Path) -> dict:
+        with self.client.pipeline(transaction=True) as pipe:
+            pipe.hgetall(self.active_key)
+            pipe.lrange(self.steps_key, 0, -1)
+            pipe.lrange(self.history_key, 0, -1)
+            pipe.get(self.last_key)
+            fields, steps, history, last = pipe.execute()
+        
+        task = None
+        if fields:
+            task = {k: _json_loads(v) for k, v in fields.items()}
+            task["steps_completed"] = steps
+        session = {"active_task": task, "history": [_json_loads(h) for h in reversed(history)]}
+        if last:
+            session["last_checkpoint"] = last
+        return session
+    
+    def _apply(self, pipe, op: dict) -> List[str]:
+        """Queue the writes for op; returns archived tasks trimmed off the history."""
+        ts = op["ts"]
+        task = self._active_task(pipe)  # read while WATCHing; writes are queued after multi()
+        overflow = []
+        if task and op["op"] != "checkpoint":
+            # One task is about to be archived: whatever sits at the limit falls off
+            overflow = pipe.lrange(self.history_key, SESSION_HISTORY_LIMIT - 1, -1)
+        pipe.multi()
+        
+        if op["op"] == "checkpoint":
+            if task:
+                if op.get("step"):
+                    pipe.rpush(self.steps_key, op["step"])
+                updates = {k: op[k] for k in ("next_steps", "blockers") if op.get(k) is not None}
+                if op.get("notes"):
+                    updates["notes"] = op["notes"]
+                if updates:
+                    pipe.hset(self.active_key, mapping={k: _json_dumps(v) for k, v in updates.items()})
+        
+        else:
+            # start_task / end_task: archive the active task (if any) and replace it
+            session = {"active_task": task, "history": []}
+            _apply_session_op(session, op)
+            for archived in session["history"]:
+                pipe.lpush(self.history_key, _json_dumps(archived))
+            if overflow:
+                pipe.ltrim(self.history_key, 0, SESSION_HISTORY_LIMIT - 1)
+            if session["active_task"] is not task:
+                pipe.delete(self.active_key, self.steps_key)
+                new_task = session["active_task"]
+                if new_task:
+                    fields = {k: _json_dumps(v) for k, v in new_task.items() if k != "steps_completed"}
+                    pipe.hset(self.active_key, mapping=fields)
+        
+        pipe.set(self.last_key, ts)
+        return overflow
+    
+    def log(self, op: dict, path: Path) -> dict:
+        overflow = self.client.transaction(
+            lambda pipe: self._apply(pipe, op),
+            self.active_key, self.steps_key, self.history_key,
+            value_from_callable=True,
+        )
+        if overflow:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _spill_history([_json_loads(t) for t in reversed(overflow)], path)
+        return self.load(path)
+
+
+_SESSION_BACKENDS = {"json": JsonSessionBackend, "redis": RedisSessionBackend}
+_session_backend_instance: Optional[SessionBackend] = None
+
+
+def _session_backend() -> SessionBackend:
+    """The backend selected by UNIFIED_MEMORY_SESSION_BACKEND, created on first use."""
+    global _session_backend_instance
+    if _session_backend_instance is None:
+        if SESSION_BACKEND not in _SESSION_BACKENDS:
+            raise ValueError(f"Unknown session backend {SESSION_BACKEND!r}. Must be one of: {list(_SESSION_BACKENDS)}")
+        _session_backend_instance = _SESSION_BACKENDS[SESSION_BACKEND]()
+    return _session_backend_instance
 
 
 def checkpoint(
@@ -347,27 +1094,13 @@ def checkpoint(
     
     Returns updated session state.
     """
-    store = load_memories(path)
-    
-    if "session_log" not in store:
-        store["session_log"] = {"active_task": None, "history": []}
-    
-    session = store["session_log"]
-    
-    if session.get("active_task"):
-        if step_completed:
-            session["active_task"]["steps_completed"].append(step_completed)
-        if next_steps is not None:
-            session["active_task"]["next_steps"] = next_steps
-        if blockers is not None:
-            session["active_task"]["blockers"] = blockers
-        if notes:
-            session["active_task"]["notes"] = notes
-    
-    session["last_checkpoint"] = now_iso()
-    save_memories(store, path)
-    
-    return session
+    return _log_session_op({
+        "op": "checkpoint",
+        "step": step_completed,
+        "next_steps": next_steps,
+        "blockers": blockers,
+        "notes": notes,
+    }, path)
 
 
 def start_task(
@@ -379,32 +1112,12 @@ def start_task(
     """
     Start a new task, archiving any existing active task.
     """
-    store = load_memories(path)
-    
-    if "session_log" not in store:
-        store["session_log"] = {"active_task": None, "history": []}
-    
-    session = store["session_log"]
-    
-    # Archive current task if exists
-    if session.get("active_task"):
-        session["active_task"]["ended"] = now_iso()
-        session["active_task"]["status"] = "interrupted"
-        session["history"].append(session["active_task"])
-    
-    # Start new task
-    session["active_task"] = {
+    return _log_session_op({
+        "op": "start_task",
         "name": name,
         "description": description,
-        "started": now_iso(),
-        "steps_completed": [],
-        "next_steps": next_steps or [],
-        "blockers": [],
-    }
-    session["last_checkpoint"] = now_iso()
-    
-    save_memories(store, path)
-    return session
+        "next_steps": next_steps,
+    }, path)
 
 
 def end_task(
@@ -417,21 +1130,17 @@ def end_task(
     
     status: 'completed', 'paused', 'blocked', 'abandoned'
     """
-    store = load_memories(path)
-    session = store.get("session_log", {"active_task": None, "history": []})
-    
-    if session.get("active_task"):
-        session["active_task"]["ended"] = now_iso()
-        session["active_task"]["status"] = status
-        if summary:
-            session["active_task"]["summary"] = summary
-        session["history"].append(session["active_task"])
-        session["active_task"] = None
-    
-    session["last_checkpoint"] = now_iso()
-    save_memories(store, path)
-    
-    return session
+    return _log_session_op({"op": "end_task", "status": status, "summary": summary}, path)
+
+
+_RECOVERY_HEADER = """\
+# Recovery Context
+Last checkpoint: {last_checkpoint}
+
+## Active Task: {name}
+{description}
+
+## Steps Completed ({done})"""
 
 
 def get_recovery_context(path: Path = DEFAULT_LOCAL_PATH) -> str:
@@ -446,37 +1155,29 @@ def get_recovery_context(path: Path = DEFAULT_LOCAL_PATH) -> str:
         return "No active task. Ready for new work."
     
     task = session["active_task"]
-    lines = [
-        f"# Recovery Context",
-        f"Last checkpoint: {session.get('last_checkpoint', 'unknown')}",
-        f"",
-        f"## Active Task: {task['name']}",
-        f"{task['description']}",
-        f"",
-        f"## Steps Completed ({len(task['steps_completed'])})",
+    done = task["steps_completed"]
+    todo = task["next_steps"]
+    
+    sections = [
+        _RECOVERY_HEADER.format(
+            last_checkpoint=session.get("last_checkpoint", "unknown"),
+            name=task["name"],
+            description=task["description"],
+            done=len(done),
+        ),
+        *[f"- ✓ {step}" for step in done],
+        f"\n## Next Steps ({len(todo)})",
+        *[f"- ○ {step}" for step in todo],
     ]
     
-    for step in task["steps_completed"]:
-        lines.append(f"- ✓ {step}")
-    
-    lines.append(f"")
-    lines.append(f"## Next Steps ({len(task['next_steps'])})")
-    
-    for step in task["next_steps"]:
-        lines.append(f"- ○ {step}")
-    
     if task.get("blockers"):
-        lines.append(f"")
-        lines.append(f"## Blockers")
-        for b in task["blockers"]:
-            lines.append(f"- ⚠ {b}")
+        sections.append("\n## Blockers")
+        sections.extend([f"- ⚠ {b}" for b in task["blockers"]])
     
     if task.get("notes"):
-        lines.append(f"")
-        lines.append(f"## Notes")
-        lines.append(task["notes"])
+        sections.append(f"\n## Notes\n{task['notes']}")
     
-    return "\n".join(lines)
+    return "\n".join(sections)
 
 
 if __name__ == "__main__":
@@ -496,7 +1197,7 @@ if __name__ == "__main__":
     elif cmd == "list":
         mtype = sys.argv[2] if len(sys.argv) > 2 else None
         memories = get_memories(memory_type=mtype)
-        print(json.dumps(memories, indent=2))
+        print(_json_dumps(memories, indent=True).decode())
     
     elif cmd == "add":
         if len(sys.argv) < 5:
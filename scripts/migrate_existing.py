@@ -17,64 +17,125 @@ Usage:
   migrate_existing.py --all
 """
 
-import json
+import contextlib
 import re
 import sys
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
 # Import from sibling module
 sys.path.insert(0, str(Path(__file__).parent))
-from memory_client import add_memory, load_memories, save_memories, DEFAULT_LOCAL_PATH
+from memory_client import memory_store, DEFAULT_LOCAL_PATH, _json_loads
 
 # Source paths
 MAC_AGENT_KV = Path.home() / "mac-agent" / "memory_backup" / "kv_store.json"
 RUNPOD_MEMORIES = Path.home() / "runpod_memories.json"
 CLAUDE_MEMORY_MD = Path.home() / "claude_memory.md"
 
+INFER_TYPE_CACHE_SIZE = 16384  # sources repeat values ("status: running"), so memoize classification
 
+
+try:
+    import ijson  # stream large JSON sources instead of loading them whole
+except ImportError:
+    ijson = None
+
+try:
+    import ahocorasick  # pyahocorasick: all keywords in one pass
+except ImportError:
+    ahocorasick = None
+
+# Type inference keywords (case-insensitive substring matches), highest priority first
+CONTENT_TYPE_KEYWORDS = (
+    ("constraint", ("never", "always must", "required", "forbidden", "illegal")),  # strict rules
+    ("decision", ("decided", "chosen", "selected", "will use", "using")),  # resolved choices
+    ("procedure", ("step", "process", "workflow", "run ", "execute", "script")),  # how-to
+    ("goal", ("goal", "target", "objective", "deadline", "by end of")),  # time-bound objectives
+    ("lesson", ("learned", "found that", "discovered", "turns out")),  # learned from experience
+    ("hypothesis", ("might", "possibly", "hypothesis", "theory", "suspect")),  # unverified
+)
+# Observation indicators are matched against the key (factual statements about environment)
+OBSERVATION_KEY_RE = re.compile(r"path|port|url|config|version")
+
+# claude_memory.md lines worth migrating, matched in one scan (surrounding whitespace ignored)
+MD_LINE_RE = re.compile(
+    r"^[^\S\n]*(?:"
+    r"#{2,3} (.*\S)"                    # 1: section header (## / ###)
+    r"|(\|([^|\n]*)\|([^|\n]*)\|.*)"  # 2: table row, 3/4: its first two cells
+    r"|- (.*\S)"                        # 5: bullet point
+    r")[^\S\n]*$",
+    re.M,
+)
+
+# Fallback: one alternation with a group per type, in priority order. The lookahead
+# tries every start position, so overlapping keywords are all seen in a single scan.
+CONTENT_TYPE_RE = re.compile("(?=" + "|".join(
+    "(" + "|".join(map(re.escape, keywords)) + ")"
+    for _, keywords in CONTENT_TYPE_KEYWORDS
+) + ")")
+
+_TYPE_AUTOMATON = None
+if ahocorasick is not None:
+    _TYPE_AUTOMATON = ahocorasick.Automaton()
+    for priority, (_, keywords) in enumerate(CONTENT_TYPE_KEYWORDS):
+        for keyword in keywords:
+            _TYPE_AUTOMATON.add_word(keyword, priority)
+    _TYPE_AUTOMATON.make_automaton()
+
+
+def _content_type(content_lower: str) -> Optional[str]:
+    """Highest-priority type whose keywords occur in content_lower, if any."""
+    if _TYPE_AUTOMATON is None:
+        matches = ((m.lastindex - 1) for m in CONTENT_TYPE_RE.finditer(content_lower))
+    else:
+        matches = (priority for _, priority in _TYPE_AUTOMATON.iter(content_lower))
+    
+    best = None
+    for priority in matches:
+        if best is None or priority < best:
+            best = priority
+            if best == 0:
+                break
+    return None if best is None else CONTENT_TYPE_KEYWORDS[best][0]
+
+
+@lru_cache(maxsize=INFER_TYPE_CACHE_SIZE)
 def infer_type_from_content(content: str, key: str = "") -> str:
     """
     Heuristically infer memory type from content.
     
     This is imperfect - human review recommended for high-authority types.
     """
-    content_lower = content.lower()
-    key_lower = key.lower()
-    
-    # Constraint indicators (strict rules)
-    if any(x in content_lower for x in ["never", "always must", "required", "forbidden", "illegal"]):
-        return "constraint"
-    
-    # Decision indicators (resolved choices)
-    if any(x in content_lower for x in ["decided", "chosen", "selected", "will use", "using"]):
-        return "decision"
-    
-    # Procedure indicators (how-to)
-    if any(x in content_lower for x in ["step", "process", "workflow", "run ", "execute", "script"]):
-        return "procedure"
-    
-    # Goal indicators (time-bound objectives)
-    if any(x in content_lower for x in ["goal", "target", "objective", "deadline", "by end of"]):
-        return "goal"
+    mtype = _content_type(content.lower())
+    if mtype:
+        return mtype
     
-    # Lesson indicators (learned from experience)
-    if any(x in content_lower for x in ["learned", "found that", "discovered", "turns out"]):
-        return "lesson"
-    
-    # Hypothesis indicators (unverified)
-    if any(x in content_lower for x in ["might", "possibly", "hypothesis", "theory", "suspect"]):
-        return "hypothesis"
-    
-    # Observation indicators (factual statements about environment)
-    if any(x in key_lower for x in ["path", "port", "url", "config", "version"]):
+    if OBSERVATION_KEY_RE.search(key.lower()):
         return "observation"
     
     # Default to preference (lowest authority, safest)
     return "preference"
 
 
+def _target_store(dry_run: bool):
+    """
+    The store to migrate into: held open so every entry is added in memory
+    and saved once on exit. A dry run only prints, so it gets None.
+    """
+    return contextlib.nullcontext() if dry_run else memory_store()
+
+
+def iter_json_object(path: Path) -> Iterator[Tuple[str, Any]]:
+    """Yield (key, value) pairs of a top-level JSON object, streamed when ijson is available."""
+    with open(path, "rb") as f:
+        if ijson is not None:
+            yield from ijson.kvitems(f, "", use_float=True)
+        else:
+            yield from _json_loads(f.read()).items()
+
+
 def migrate_mac_agent_kv(dry_run: bool = False) -> int:
     """Migrate memories from mac-agent KV store."""
     if not MAC_AGENT_KV.exists():
@@ -83,38 +144,35 @@ def migrate_mac_agent_kv(dry_run: bool = False) -> int:
     
     print(f"Loading: {MAC_AGENT_KV}")
     
-    # This file can be large, stream-process it
-    with open(MAC_AGENT_KV) as f:
-        kv_store = json.load(f)
-    
-    migrated = 0
-    for key, entry in kv_store.items():
-        value = entry.get("value", "")
-        if not value or len(value) < 3:  # Skip empty/trivial entries
-            continue
-        
-        content = f"{key}: {value}"
-        mtype = infer_type_from_content(content, key)
-        tags = entry.get("tags", [])
-        
-        # Parse timestamp
-        created = entry.get("created_at")
-        
-        if dry_run:
-            print(f"  [{mtype}] {content[:80]}...")
-        else:
-            try:
-                add_memory(
-                    content=content,
-                    memory_type=mtype,
-                    source="agent",
-                    tags=tags + ["migrated", "mac-agent"],
-                    agent_id="mac-agent-v1",
-                )
-                migrated += 1
-            except Exception as e:
-                print(f"  Error: {e}")
-    
+    with _target_store(dry_run) as store:
+        migrated = 0
+        # This file can be large, stream-process it
+        for key, entry in iter_json_object(MAC_AGENT_KV):
+            value = entry.get("value", "")
+            if not value or len(value) < 3:  # Skip empty/trivial entries
+                continue
+            
+            content = f"{key}: {value}"
+            mtype = infer_type_from_content(content, key)
+            tags = entry.get("tags", [])
+            
+            # Parse timestamp
+            created = entry.get("created_at")
+            
+            if dry_run:
+                print(f"  [{mtype}] {content[:80]}...")
+            else:
+                try:
+                    store.add(
+                        content=content,
+                        memory_type=mtype,
+                        source="agent",
+                        tags=tags + ["migrated", "mac-agent"],
+                        agent_id="mac-agent-v1",
+                    )
+                    migrated += 1
+                except Exception as e:
+                    print(f"  Error: {e}")
     return migrated
 
 
@@ -126,33 +184,30 @@ def migrate_runpod_memories(dry_run: bool = False) -> int:
     
     print(f"Loading: {RUNPOD_MEMORIES}")
     
-    with open(RUNPOD_MEMORIES) as f:
-        memories = json.load(f)
-    
-    migrated = 0
-    for key, entry in memories.items():
-        value = entry.get("value", "")
-        if not value:
-            continue
-        
-        content = f"{key}: {value}"
-        mtype = infer_type_from_content(content, key)
-        
-        if dry_run:
-            print(f"  [{mtype}] {content[:80]}...")
-        else:
-            try:
-                add_memory(
-                    content=content,
-                    memory_type=mtype,
-                    source="agent",
-                    tags=["migrated", "runpod"],
-                    agent_id="runpod-agent",
-                )
-                migrated += 1
-            except Exception as e:
-                print(f"  Error: {e}")
-    
+    with _target_store(dry_run) as store:
+        migrated = 0
+        for key, entry in iter_json_object(RUNPOD_MEMORIES):
+            value = entry.get("value", "")
+            if not value:
+                continue
+            
+            content = f"{key}: {value}"
+            mtype = infer_type_from_content(content, key)
+            
+            if dry_run:
+                print(f"  [{mtype}] {content[:80]}...")
+            else:
+                try:
+                    store.add(
+                        content=content,
+                        memory_type=mtype,
+                        source="agent",
+                        tags=["migrated", "runpod"],
+                        agent_id="runpod-agent",
+                    )
+                    migrated += 1
+                except Exception as e:
+                    print(f"  Error: {e}")
     return migrated
 
 
@@ -167,70 +222,65 @@ def migrate_claude_memory_md(dry_run: bool = False) -> int:
     with open(CLAUDE_MEMORY_MD) as f:
         content = f.read()
     
-    migrated = 0
-    
-    # Parse markdown structure
-    current_section = None
-    
-    for line in content.split("\n"):
-        line = line.strip()
-        
-        # Track sections
-        if line.startswith("## "):
-            current_section = line[3:].lower()
-            continue
-        if line.startswith("### "):
-            current_section = line[4:].lower()
-            continue
+    with _target_store(dry_run) as store:
+        migrated = 0
         
-        # Skip empty lines and headers
-        if not line or line.startswith("#"):
-            continue
+        # Parse markdown structure; other lines (blank, # / #### headers, prose) never match
+        current_section = None
         
-        # Parse table rows (| Port | Service |)
-        if line.startswith("|") and "---" not in line:
-            cells = [c.strip() for c in line.split("|")[1:-1]]
-            if len(cells) >= 2 and cells[0] and cells[1]:
-                # Skip header rows
-                if cells[0].lower() in ["port", "key", "name"]:
+        for match in MD_LINE_RE.finditer(content):
+            section, row, first, second, bullet = match.groups()
+            
+            # Track sections
+            if section is not None:
+                current_section = section.lower()
+                continue
+            
+            # Parse table rows (| Port | Service |), skipping separator rows
+            if row is not None:
+                if "---" in row:
                     continue
-                content_str = f"{cells[1]} on port {cells[0]}" if cells[0].isdigit() else f"{cells[0]}: {cells[1]}"
-                mtype = "observation"  # Service configs are observations
+                first, second = first.strip(), second.strip()
+                if first and second:
+                    # Skip header rows
+                    if first.lower() in ["port", "key", "name"]:
+                        continue
+                    content_str = f"{second} on port {first}" if first.isdigit() else f"{first}: {second}"
+                    mtype = "observation"  # Service configs are observations
+                    
+                    if dry_run:
+                        print(f"  [{mtype}] {content_str}")
+                    else:
+                        try:
+                            store.add(
+                                content=content_str,
+                                memory_type=mtype,
+                                source="claude",
+                                tags=["migrated", "claude-md", current_section or "general"],
+                                context="origin-os" if "origin" in (current_section or "").lower() else None,
+                            )
+                            migrated += 1
+                        except Exception as e:
+                            print(f"  Error: {e}")
+            
+            # Parse bullet points
+            else:
+                content_str = bullet
+                mtype = infer_type_from_content(content_str)
                 
                 if dry_run:
-                    print(f"  [{mtype}] {content_str}")
+                    print(f"  [{mtype}] {content_str[:80]}...")
                 else:
                     try:
-                        add_memory(
+                        store.add(
                             content=content_str,
                             memory_type=mtype,
                             source="claude",
                             tags=["migrated", "claude-md", current_section or "general"],
-                            context="origin-os" if "origin" in (current_section or "").lower() else None,
                         )
                         migrated += 1
                     except Exception as e:
                         print(f"  Error: {e}")
-        
-        # Parse bullet points
-        elif line.startswith("- "):
-            content_str = line[2:]
-            mtype = infer_type_from_content(content_str)
-            
-            if dry_run:
-                print(f"  [{mtype}] {content_str[:80]}...")
-            else:
-                try:
-                    add_memory(
-                        content=content_str,
-                        memory_type=mtype,
-                        source="claude",
-                        tags=["migrated", "claude-md", current_section or "general"],
-                    )
-                    migrated += 1
-                except Exception as e:
-                    print(f"  Error: {e}")
-    
     return migrated
 
 
@@ -16,15 +16,30 @@ Environment variables:
 
 import os
 import sys
-import json
+import hashlib
 import subprocess
 from pathlib import Path
 from datetime import datetime, timezone
 
+try:
+    import pygit2  # libgit2 binding: local git work without spawning processes
+except ImportError:
+    pygit2 = None
+
+sys.path.insert(0, str(Path(__file__).parent))
+from memory_client import load_memories_readonly, save_memories, compact_journal
+
 # Configuration
 DEFAULT_REPO = "cwalinapj/unified-memory"
 LOCAL_PATH = Path.home() / "unified-memory"
 MEMORY_FILE = "memories.json"
+HASH_CHUNK_SIZE = 1 << 20  # bytes per read when hashing on Pythons without file_digest
+
+# Remote default branch, looked up once per process (see default_branch)
+_DEFAULT_BRANCH = None
+
+# In-process repository handle (pygit2 only, see open_repo)
+_REPO = None
 
 
 def get_repo() -> str:
@@ -42,6 +57,133 @@ def run_git(args: list, cwd: Path = LOCAL_PATH) -> tuple:
     return result.returncode, result.stdout.strip(), result.stderr.strip()
 
 
+def _run_git_silent(args: list, cwd: Path = LOCAL_PATH) -> int:
+    """Run a git command whose output is not needed and return its exit code."""
+    return subprocess.run(
+        ["git"] + args,
+        cwd=cwd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    ).returncode
+
+
+def open_repo():
+    """Return the resident pygit2 repository, or None to shell out to git."""
+    global _REPO
+    if _REPO is None and pygit2 is not None:
+        try:
+            _REPO = pygit2.Repository(str(LOCAL_PATH))
+        except pygit2.GitError:
+            return None
+    return _REPO
+
+
+# pygit2 status flags -> porcelain codes (worktree flags only when the index is clean)
+_STATUS_CODES = () if pygit2 is None else (
+    (pygit2.GIT_STATUS_WT_NEW, "??"),
+    (pygit2.GIT_STATUS_INDEX_NEW, "A "),
+    (pygit2.GIT_STATUS_INDEX_MODIFIED, "M "),
+    (pygit2.GIT_STATUS_INDEX_DELETED, "D "),
+    (pygit2.GIT_STATUS_WT_MODIFIED, " M"),
+    (pygit2.GIT_STATUS_WT_DELETED, " D"),
+)
+
+
+def local_changes() -> list:
+    """Porcelain-style lines for uncommitted changes."""
+    repo = open_repo()
+    if repo is None:
+        code, out, _ = run_git(["status", "--porcelain"])
+        return out.split("\n") if out else []
+    
+    lines = []
+    for path, flags in sorted(repo.status().items()):
+        if flags & pygit2.GIT_STATUS_IGNORED:
+            continue
+        code = next((c for flag, c in _STATUS_CODES if flags & flag), "??")
+        lines.append(f"{code} {path}")
+    return lines
+
+
+def commit_memory_file(message: str) -> tuple:
+    """Stage and commit memories.json alone. Returns (committed, error); (False, "") if it is unchanged."""
+    # Only memories.json: agents.json (API key hashes), logs and index files stay local
+    repo = open_repo()
+    if repo is None:
+        code, _, err = run_git(["commit", "-m", message, "--", MEMORY_FILE])
+        if code == 0:
+            return True, ""
+        if _run_git_silent(["ls-files", "--error-unmatch", "--", MEMORY_FILE]) != 0:
+            # Not tracked yet (cloned from a repo without it): stage it, then commit
+            _run_git_silent(["add", "--", MEMORY_FILE])
+            code, _, err = run_git(["commit", "-m", message, "--", MEMORY_FILE])
+            if code == 0:
+                return True, ""
+        if _run_git_silent(["diff", "--quiet", "HEAD", "--", MEMORY_FILE]) == 0:
+            return False, ""
+        return False, err or "git commit failed"
+    
+    try:
+        blob_id = repo.create_blob_fromworkdir(MEMORY_FILE)
+        head_tree = None if repo.head_is_unborn else repo.head.peel(pygit2.Commit).tree
+        if head_tree is not None and MEMORY_FILE in head_tree and head_tree[MEMORY_FILE].id == blob_id:
+            return False, ""
+        
+        # Like `git commit -- memories.json`: HEAD's tree plus this one file,
+        # whatever else is staged
+        tree_index = pygit2.Index()
+        if head_tree is not None:
+            tree_index.read_tree(head_tree)
+        tree_index.add(pygit2.IndexEntry(MEMORY_FILE, blob_id, pygit2.GIT_FILEMODE_BLOB))
+        tree_id = tree_index.write_tree(repo)
+        
+        index = repo.index
+        index.read()  # git may have touched the index since the repo was opened
+        index.add(MEMORY_FILE)
+        index.write()
+        signature = repo.default_signature
+        parents = [] if head_tree is None else [repo.head.target]
+        repo.create_commit("HEAD", signature, signature, message, tree_id, parents)
+        return True, ""
+    except (pygit2.GitError, KeyError, OSError) as e:
+        return False, str(e)
+
+
+def default_branch() -> str:
+    """Branch to push/pull: the remote's HEAD, else the local branch, else main."""
+    global _DEFAULT_BRANCH
+    repo = open_repo()
+    if _DEFAULT_BRANCH is None and repo is not None:
+        ref = repo.references.get("refs/remotes/origin/HEAD") or repo.references["HEAD"]
+        if isinstance(ref.target, str):
+            _DEFAULT_BRANCH = ref.target.removeprefix("refs/remotes/origin/").removeprefix("refs/heads/")
+    if _DEFAULT_BRANCH is None:
+        code, out, _ = run_git(["symbolic-ref", "--short", "refs/remotes/origin/HEAD"])
+        if code == 0 and out:
+            _DEFAULT_BRANCH = out.split("/", 1)[-1]
+        else:
+            # Freshly initialized repo: origin/HEAD is unknown until a clone/fetch
+            code, out, _ = run_git(["symbolic-ref", "--short", "HEAD"])
+            _DEFAULT_BRANCH = out if code == 0 and out else "main"
+    return _DEFAULT_BRANCH
+
+
+def remote_commits() -> list:
+    """One-line summaries of commits on origin's default branch not yet in HEAD."""
+    branch = default_branch()
+    repo = open_repo()
+    if repo is None:
+        code, out, _ = run_git(["log", f"HEAD..origin/{branch}", "--oneline"])
+        return out.split("\n") if code == 0 and out else []
+    
+    remote = repo.references.get(f"refs/remotes/origin/{branch}")
+    if remote is None or repo.head_is_unborn:
+        return []
+    walker = repo.walk(remote.target, pygit2.GIT_SORT_TOPOLOGICAL)
+    walker.hide(repo.head.target)
+    return [f"{commit.short_id} {commit.message.splitlines()[0]}" for commit in walker]
+
+
 def ensure_repo_initialized() -> bool:
     """Ensure local directory is a git repo connected to remote."""
     LOCAL_PATH.mkdir(parents=True, exist_ok=True)
@@ -66,8 +208,8 @@ def ensure_repo_initialized() -> bool:
     if code != 0:
         # Repo might not exist, initialize locally
         print(f"Creating new repo (clone failed: {err})")
-        run_git(["init"], cwd=LOCAL_PATH)
-        run_git(["remote", "add", "origin", remote_url], cwd=LOCAL_PATH)
+        _run_git_silent(["init"], cwd=LOCAL_PATH)
+        _run_git_silent(["remote", "add", "origin", remote_url], cwd=LOCAL_PATH)
         
         # Create initial memory file if needed
         memory_path = LOCAL_PATH / MEMORY_FILE
@@ -77,12 +219,11 @@ def ensure_repo_initialized() -> bool:
                 "last_sync": datetime.now(timezone.utc).isoformat(),
                 "memories": []
             }
-            with open(memory_path, "w") as f:
-                json.dump(initial_store, f, indent=2)
+            save_memories(initial_store, memory_path)
         
         # Initial commit
-        run_git(["add", MEMORY_FILE])
-        run_git(["commit", "-m", "Initialize unified memory store"])
+        _run_git_silent(["add", MEMORY_FILE])
+        _run_git_silent(["commit", "-m", "Initialize unified memory store"])
     
     return True
 
@@ -93,31 +234,33 @@ def get_local_hash() -> str:
     if not memory_path.exists():
         return ""
     with open(memory_path, "rb") as f:
-        import hashlib
-        return hashlib.sha256(f.read()).hexdigest()[:12]
+        # Stream in fixed-size chunks instead of reading the whole file
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(f, "sha256").hexdigest()[:12]
+        digest = hashlib.sha256()
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        return digest.hexdigest()[:12]
 
 
 def push() -> bool:
     """Push local changes to GitHub."""
     ensure_repo_initialized()
     
-    # Check for changes
-    code, status, _ = run_git(["status", "--porcelain"])
-    if not status:
-        print("No local changes to push.")
-        return True
-    
-    # Stage and commit
-    run_git(["add", MEMORY_FILE])
+    # Only memories.json is tracked, so fold in any journaled memories first
+    compact_journal(LOCAL_PATH / MEMORY_FILE)
     
+    # Stage and commit in one go; an unchanged memories.json is not an error
     now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
-    run_git(["commit", "-m", f"Memory sync: {now}"])
+    committed, err = commit_memory_file(f"Memory sync: {now}")
+    if not committed:
+        if not err:
+            print("No local changes to push.")
+            return True
+        print(f"✗ Commit failed: {err}")
+        return False
     
-    # Push
-    code, out, err = run_git(["push", "-u", "origin", "main"])
-    if code != 0:
-        # Try master branch
-        code, out, err = run_git(["push", "-u", "origin", "master"])
+    code, out, err = run_git(["push", "-u", "origin", default_branch()])
     
     if code == 0:
         print(f"✓ Pushed to {get_repo()}")
@@ -132,9 +275,7 @@ def pull() -> bool:
     ensure_repo_initialized()
     
     # Fetch and merge
-    code, out, err = run_git(["pull", "--rebase", "origin", "main"])
-    if code != 0:
-        code, out, err = run_git(["pull", "--rebase", "origin", "master"])
+    code, out, err = run_git(["pull", "--rebase", "origin", default_branch()])
     
     if code == 0:
         print(f"✓ Pulled from {get_repo()}")
@@ -153,26 +294,25 @@ def status() -> None:
     print(f"Local hash: {get_local_hash()}")
     
     # Check git status
-    code, out, _ = run_git(["status", "--porcelain"])
-    if out:
+    changes = local_changes()
+    if changes:
         print("Local changes:")
-        for line in out.split("\n"):
+        for line in changes:
             print(f"  {line}")
     else:
         print("No local changes")
     
     # Check remote
-    code, out, _ = run_git(["log", "HEAD..origin/main", "--oneline"])
-    if code == 0 and out:
+    remote = remote_commits()
+    if remote:
         print("Remote changes:")
-        for line in out.split("\n"):
+        for line in remote:
             print(f"  {line}")
     
     # Memory stats
     memory_path = LOCAL_PATH / MEMORY_FILE
     if memory_path.exists():
-        with open(memory_path) as f:
-            store = json.load(f)
+        store = load_memories_readonly(memory_path)
         print(f"\nMemories: {len(store['memories'])}")
         print(f"Last sync: {store.get('last_sync', 'never')}")
         
@@ -5,225 +5,501 @@ Memory API Server
 HTTP endpoint for agents to query memories.
 Runs on localhost:7437 (MEMO on phone keypad)
 
-Auto-rebuilds index on writes.
+Writes are added to the index in place; a full rebuild runs every
+REBUILD_EVERY writes (or on /rebuild).
 
 Endpoints:
     POST /search     - Semantic search
     POST /context    - Get context for LLM injection
-    POST /write      - Write new memory (auto-rebuilds index)
+    POST /write      - Write new memory (added to the index in place)
+    POST /add        - Add an already-stored memory to the index in place
     POST /rebuild    - Force rebuild index
     GET  /health     - Health check
     GET  /stats      - Memory statistics
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import json
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import hashlib
+import os
+import queue
 import sys
 import threading
 import time
+from collections import Counter
+from concurrent.futures import Future
 from pathlib import Path
+from urllib.parse import parse_qs
 
 sys.path.insert(0, str(Path(__file__).parent))
-from index import search, search_for_context, load_model, load_index, get_authority, build_index
+from index import search, search_for_context, load_model, load_index, get_authority, rebuild_index, load_memories, add_to_index
+from query_cache import QueryCache
+from store_io import json_loads as _json_loads, json_dumps as _json_dumps, append_journal, compact_journal
 
 MEMORY_PATH = Path.home() / "unified-memory" / "memories.json"
+MEMORY_JOURNAL_PATH = MEMORY_PATH.with_suffix(".jsonl")  # appended since last compaction
+# Fold the journal into memories.json once it outgrows half the snapshot (store on disk
+# past 1.5x its compacted size), and never below JOURNAL_COMPACT_BYTES. Rewrites then
+# stay amortized O(1) bytes per /write as the store grows.
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+JOURNAL_COMPACT_RATIO = 0.5
 INDEX_DIR = Path.home() / "unified-memory" / "index"
 LOG_DIR = Path.home() / "unified-memory" / "logs"
 PORT = 7437
 
-# Track writes for batched rebuilds
-_pending_rebuild = False
+# Requests are handled on their own threads; this caps how many run a search
+# (embedding + FAISS) at once so model inference does not oversubscribe the CPU
+SEARCH_CONCURRENCY = os.cpu_count() or 4
+_search_slots = threading.BoundedSemaphore(SEARCH_CONCURRENCY)
+
+# Encoded /search and /context bodies for repeated queries (cleared whenever the index changes)
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_TTL = 60.0  # seconds
+response_cache = QueryCache(max_size=RESPONSE_CACHE_SIZE, ttl_seconds=RESPONSE_CACHE_TTL)
+
+# Guards journal appends/compaction and the cached memory list
+_write_lock = threading.Lock()
+_memories_cache = None  # snapshot + journal as of _memories_stamp
+_memories_stamp = None
+_type_counts = Counter()  # /stats histogram, kept in step with _memories_cache
+
+# /write requests are group-committed by one writer thread: everything queued
+# while the previous batch was being written goes out in a single append
+WRITE_BATCH_MAX = 256
+_write_queue = queue.Queue()  # (memory, Future resolved with the rebuild status)
+_writer_thread = None
+_writer_lock = threading.Lock()
+
+# Writes are batched: one rebuild runs once no write has arrived for REBUILD_DELAY
+REBUILD_DELAY = 2.0  # seconds
+REBUILD_EVERY = 1000  # /write adds to the live index in place; rebuild fully after this many
+_rebuild_timer = None
 _rebuild_lock = threading.Lock()
 _last_rebuild = 0
+_appends_since_rebuild = 0
 
-def async_rebuild():
-    """Rebuild index in background thread"""
-    global _pending_rebuild, _last_rebuild
-    
-    # Debounce - wait 2 seconds for batch writes
-    time.sleep(2)
+def _do_rebuild():
+    """Rebuild index (runs on the rebuild timer thread)"""
+    global _last_rebuild, _appends_since_rebuild
     
     with _rebuild_lock:
-        if not _pending_rebuild:
-            return
-        _pending_rebuild = False
+        _appends_since_rebuild = 0
     
     try:
         print("[MEMO] Rebuilding index...")
-        build_index()
+        # Writes keep adding to the current index meanwhile; searches in flight finish on it
+        rebuild_index()
         _last_rebuild = time.time()
         
-        # Reload index in memory
-        global _index, _memories
-        import index as idx
-        idx._index = None
-        idx._memories = None
-        load_index()
-        
+        response_cache.clear()
         print("[MEMO] Index rebuilt successfully")
     except Exception as e:
         print(f"[MEMO] Rebuild failed: {e}")
 
 def trigger_rebuild():
-    """Trigger async index rebuild"""
-    global _pending_rebuild
+    """Schedule an index rebuild, pushing back one that is already pending"""
+    global _rebuild_timer
+    
+    with _rebuild_lock:
+        if _rebuild_timer is not None:
+            _rebuild_timer.cancel()  # no-op if it already fired
+        _rebuild_timer = threading.Timer(REBUILD_DELAY, _do_rebuild)
+        _rebuild_timer.daemon = True
+        _rebuild_timer.start()
+
+# Constant response bodies, encoded once (/health is polled by supervisors)
+_HEALTH_BODY = _json_dumps({"status": "ok", "port": PORT})
+_HEALTH_LENGTH = str(len(_HEALTH_BODY))
+_REBUILD_BODY = _json_dumps({"status": "rebuild scheduled"})
+_REBUILD_LENGTH = str(len(_REBUILD_BODY))
+_NOT_FOUND_BODY = _json_dumps({"error": "Not found"})
+_NOT_FOUND_LENGTH = str(len(_NOT_FOUND_BODY))
+_CONTENT_REQUIRED_BODY = _json_dumps({"error": "content required"})
+_CONTENT_REQUIRED_LENGTH = str(len(_CONTENT_REQUIRED_BODY))
+_ID_CONTENT_REQUIRED_BODY = _json_dumps({"error": "id and content required"})
+_ID_CONTENT_REQUIRED_LENGTH = str(len(_ID_CONTENT_REQUIRED_BODY))
+
+# Accept type (or ?columnar=1) selecting the columnar /search shape
+COLUMNAR_MEDIA_TYPE = "application/vnd.memo.columnar+json"
+
+class BadRequest(ValueError):
+    """Malformed request body (sent back as a 400)"""
+
+def _field(data: dict, name: str, kind, default):
+    """data[name] if present and of the given type, default if missing or null"""
+    value = data.get(name)
+    if value is None:
+        return default
+    # bool is an int subclass but never a valid count
+    if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+        raise BadRequest(f"{name} must be {kind.__name__}")
+    return value
+
+def _positive_field(data: dict, name: str, default: int) -> int:
+    """data[name] as a positive int (FAISS and the token budget reject anything else)"""
+    value = _field(data, name, int, default)
+    if value <= 0:
+        raise BadRequest(f"{name} must be positive")
+    return value
+
+def _parse_search(data: dict) -> tuple:
+    """(query, n, type, min_authority) from a /search body"""
+    return (
+        _field(data, "query", str, ""),
+        _positive_field(data, "n", 5),
+        _field(data, "type", str, None),
+        _field(data, "min_authority", int, 0),
+    )
+
+def _parse_context(data: dict) -> tuple:
+    """(query, max_tokens) from a /context body"""
+    return _field(data, "query", str, ""), _positive_field(data, "max_tokens", 2000)
+
+def _encode_search(query: str, results) -> bytearray:
+    """/search response body, written straight from the SearchResults (no outer dict/list)"""
+    body = bytearray(b'{"query":')
+    body += _json_dumps(query)
+    body += b',"results":['
+    body += b",".join(
+        _json_dumps({
+            "id": r.memory_id,
+            "type": r.memory_type,
+            "content": r.content,
+            "score": r.score,
+            "authority": r.authority,
+            "tags": r.tags,
+        })
+        for r in results
+    )
+    body += b"]}"
+    return body
+
+def _encode_search_columnar(query: str, results) -> bytes:
+    """/search response body with one list per field instead of one object per result"""
+    return _json_dumps({
+        "query": query,
+        "ids": [r.memory_id for r in results],
+        "types": [r.memory_type for r in results],
+        "contents": [r.content for r in results],
+        "scores": [r.score for r in results],
+        "authorities": [r.authority for r in results],
+        "tags": [r.tags for r in results],
+    })
+
+def _store_stamp() -> tuple:
+    """(mtime, size) of the snapshot and journal - changes whenever either is written"""
+    stamp = []
+    for path in (MEMORY_PATH, MEMORY_JOURNAL_PATH):
+        try:
+            st = path.stat()
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+def cached_memories() -> list:
+    """All memories, re-read only when another process has changed the store files"""
+    global _memories_cache, _memories_stamp, _type_counts
+    
+    with _write_lock:
+        stamp = _store_stamp()
+        if _memories_cache is None or stamp != _memories_stamp:
+            _memories_cache = load_memories()
+            _memories_stamp = stamp
+            _type_counts = Counter(m.get("type", "unknown") for m in _memories_cache)
+        return _memories_cache
+
+def memory_stats() -> tuple:
+    """(total, by_type) without scanning the memories unless the store changed on disk"""
+    memories = cached_memories()
+    with _write_lock:
+        return len(memories), dict(_type_counts)
+
+def _snapshot_size() -> int:
+    try:
+        return MEMORY_PATH.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+def append_memories(mems: list):
+    """Persist memories as journal lines (one write) instead of rewriting memories.json"""
+    global _memories_stamp
+    
+    lines = b"".join(_json_dumps(mem) + b"\n" for mem in mems)
+    with _write_lock:
+        fresh = _memories_cache is not None and _store_stamp() == _memories_stamp
+        size = append_journal(MEMORY_JOURNAL_PATH, lines)
+        
+        if size > JOURNAL_COMPACT_BYTES and size > JOURNAL_COMPACT_RATIO * _snapshot_size():
+            compact_journal(MEMORY_PATH, MEMORY_JOURNAL_PATH)
+        
+        # Keep the cache current without re-reading what we just wrote
+        if fresh:
+            _memories_cache.extend(mems)
+            _type_counts.update(mem.get("type", "unknown") for mem in mems)
+            _memories_stamp = _store_stamp()
+
+def index_memories(mems: list) -> str:
+    """Add stored memories to the live index; returns the rebuild status for the response"""
+    global _appends_since_rebuild
+    
+    # No index to add to yet - build one from the store
+    if not (INDEX_DIR / "faiss.index").exists():
+        trigger_rebuild()
+        return "scheduled"
+    
+    try:
+        for mem in mems:
+            add_to_index(mem)
+    except Exception as e:
+        print(f"[MEMO] In-place index add failed, rebuilding: {e}")
+        trigger_rebuild()
+        return "scheduled"
+    response_cache.clear()
     
+    # Periodic full rebuild re-picks flat vs HNSW and rebuilds the graph from scratch
     with _rebuild_lock:
-        if _pending_rebuild:
-            return  # Already scheduled
-        _pending_rebuild = True
+        _appends_since_rebuild += len(mems)
+        due = _appends_since_rebuild >= REBUILD_EVERY
+    if due:
+        trigger_rebuild()
+        return "scheduled"
+    return "not needed"
+
+def _writer_loop():
+    """Drain the write queue: persist, index and answer each batch together"""
+    while True:
+        batch = [_write_queue.get()]
+        while len(batch) < WRITE_BATCH_MAX:
+            try:
+                batch.append(_write_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        # One timestamp for the whole batch (they are committed together)
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%SZ")
+        mems = [mem for mem, _ in batch]
+        for mem in mems:
+            mem["provenance"]["timestamp"] = timestamp
+        try:
+            append_memories(mems)
+            rebuild = index_memories(mems)
+        except Exception as e:
+            for _, done in batch:
+                done.set_exception(e)
+        else:
+            for _, done in batch:
+                done.set_result(rebuild)
+
+def submit_write(mem: dict) -> str:
+    """Queue a memory for the writer thread; returns once it is persisted and indexed"""
+    global _writer_thread
+    
+    with _writer_lock:
+        if _writer_thread is None:
+            _writer_thread = threading.Thread(target=_writer_loop, daemon=True, name="memo-writer")
+            _writer_thread.start()
     
-    thread = threading.Thread(target=async_rebuild, daemon=True)
-    thread.start()
+    done = Future()
+    _write_queue.put((mem, done))
+    return done.result()
+
+def warm_up():
+    """Run one search so the first request is not cold (model buffers, FAISS scratch space)"""
+    search("warmup", n=1)
+
+class MemoryServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128  # listen backlog; the default 5 resets bursts of concurrent clients
 
 class MemoryHandler(BaseHTTPRequestHandler):
+    # Persistent connections: every response carries Content-Length, so clients
+    # can send many requests over one socket
+    protocol_version = "HTTP/1.1"
+    
+    # Headers and body go out as separate writes; with Nagle on, the body
+    # waits for the client's delayed ACK on keep-alive connections
+    disable_nagle_algorithm = True
+    
     def _send_json(self, data: dict, status: int = 200):
+        self._send_body(_json_dumps(data), status)
+    
+    def _send_body(self, body: bytes, status: int = 200, length: str = None):
         self.send_response(status)
         self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", length or str(len(body)))
         self.send_header("Access-Control-Allow-Origin", "*")
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
     
     def _read_json(self) -> dict:
         length = int(self.headers.get("Content-Length", 0))
         body = self.rfile.read(length)
-        return json.loads(body) if body else {}
+        data = _json_loads(body) if body else {}
+        if not isinstance(data, dict):
+            raise BadRequest("request body must be a JSON object")
+        return data
     
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
         self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Content-Length", "0")
         self.end_headers()
     
     def do_GET(self):
-        if self.path == "/health":
-            self._send_json({"status": "ok", "port": PORT})
-        
-        elif self.path == "/stats":
-            try:
-                with open(MEMORY_PATH) as f:
-                    data = json.load(f)
-                memories = data.get("memories", [])
-                
-                types = {}
-                for mem in memories:
-                    t = mem.get("type", "unknown")
-                    types[t] = types.get(t, 0) + 1
-                
-                self._send_json({
-                    "total": len(memories),
-                    "by_type": types,
-                    "last_rebuild": _last_rebuild,
-                    "index_exists": (INDEX_DIR / "faiss.index").exists(),
-                })
-            except Exception as e:
-                self._send_json({"error": str(e)}, 500)
-        
-        else:
-            self._send_json({"error": "Not found"}, 404)
+        route, _, self.query_string = self.path.partition("?")
+        handler = self._GET_ROUTES.get(route)
+        if handler is None:
+            self._send_body(_NOT_FOUND_BODY, 404, _NOT_FOUND_LENGTH)
+            return
+        handler(self)
     
     def do_POST(self):
         try:
             data = self._read_json()
             
-            if self.path == "/search":
-                query = data.get("query", "")
-                n = data.get("n", 5)
-                memory_type = data.get("type")
-                min_authority = data.get("min_authority", 0)
-                
-                results = search(query, n=n, memory_type=memory_type, min_authority=min_authority)
-                
-                self._send_json({
-                    "query": query,
-                    "results": [
-                        {
-                            "id": r.memory_id,
-                            "type": r.memory_type,
-                            "content": r.content,
-                            "score": r.score,
-                            "authority": r.authority,
-                            "tags": r.tags,
-                        }
-                        for r in results
-                    ]
-                })
-            
-            elif self.path == "/context":
-                query = data.get("query", "")
-                max_tokens = data.get("max_tokens", 2000)
-                
-                context = search_for_context(query, max_tokens=max_tokens)
-                
-                self._send_json({
-                    "query": query,
-                    "context": context,
-                })
-            
-            elif self.path == "/write":
-                content = data.get("content")
-                memory_type = data.get("type", "observation")
-                tags = data.get("tags", [])
-                source = data.get("source", "agent")
-                rationale = data.get("rationale")
-                confidence = data.get("confidence")
-                
-                if not content:
-                    self._send_json({"error": "content required"}, 400)
-                    return
-                
-                # Load existing
-                with open(MEMORY_PATH) as f:
-                    store = json.load(f)
-                
-                memories = store.get("memories", [])
-                
-                # Generate ID
-                import hashlib
-                mem_id = f"mem-{hashlib.sha256(f'{content}{time.time()}'.encode()).hexdigest()[:8]}"
-                
-                new_mem = {
-                    "id": mem_id,
-                    "type": memory_type,
-                    "content": content,
-                    "tags": tags,
-                    "provenance": {
-                        "source": source,
-                        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                    }
-                }
-                
-                if rationale:
-                    new_mem["rationale"] = rationale
-                if confidence is not None:
-                    new_mem["confidence"] = confidence
-                
-                memories.append(new_mem)
-                store["memories"] = memories
-                
-                with open(MEMORY_PATH, "w") as f:
-                    json.dump(store, f, indent=2)
-                
-                # Trigger async rebuild
-                trigger_rebuild()
-                
-                self._send_json({
-                    "id": mem_id,
-                    "status": "created",
-                    "rebuild": "scheduled"
-                })
-            
-            elif self.path == "/rebuild":
-                trigger_rebuild()
-                self._send_json({"status": "rebuild scheduled"})
-            
-            else:
-                self._send_json({"error": "Not found"}, 404)
+            route, _, self.query_string = self.path.partition("?")
+            handler = self._POST_ROUTES.get(route)
+            if handler is None:
+                self._send_body(_NOT_FOUND_BODY, 404, _NOT_FOUND_LENGTH)
+                return
+            handler(self, data)
         
+        except BadRequest as e:
+            self._send_json({"error": str(e)}, 400)
         except Exception as e:
             self._send_json({"error": str(e)}, 500)
     
+    def _handle_health(self):
+        self._send_body(_HEALTH_BODY, length=_HEALTH_LENGTH)
+    
+    def _handle_stats(self):
+        try:
+            total, types = memory_stats()
+            
+            self._send_json({
+                "total": total,
+                "by_type": types,
+                "last_rebuild": _last_rebuild,
+                "index_exists": (INDEX_DIR / "faiss.index").exists(),
+            })
+        except Exception as e:
+            self._send_json({"error": str(e)}, 500)
+    
+    def _handle_search(self, data: dict):
+        query, n, memory_type, min_authority = _parse_search(data)
+        columnar = (
+            parse_qs(self.query_string).get("columnar") == ["1"]
+            or COLUMNAR_MEDIA_TYPE in self.headers.get("Accept", "")
+        )
+        
+        key = ("/search", query, n, memory_type, min_authority, columnar)
+        body = response_cache.get(key)
+        if body is None:
+            with _search_slots:
+                results = search(query, n=n, memory_type=memory_type, min_authority=min_authority)
+            if columnar:
+                body = _encode_search_columnar(query, results)
+            else:
+                body = bytes(_encode_search(query, results))
+            response_cache.put(key, body)
+        
+        self._send_body(body)
+    
+    def _handle_context(self, data: dict):
+        query, max_tokens = _parse_context(data)
+        
+        key = ("/context", query, max_tokens)
+        body = response_cache.get(key)
+        if body is None:
+            with _search_slots:
+                context = search_for_context(query, max_tokens=max_tokens)
+            body = _json_dumps({
+                "query": query,
+                "context": context,
+            })
+            response_cache.put(key, body)
+        
+        self._send_body(body)
+    
+    def _handle_write(self, data: dict):
+        content = data.get("content")
+        memory_type = data.get("type", "observation")
+        tags = data.get("tags", [])
+        source = data.get("source", "agent")
+        rationale = data.get("rationale")
+        confidence = data.get("confidence")
+        
+        if not content:
+            self._send_body(_CONTENT_REQUIRED_BODY, 400, _CONTENT_REQUIRED_LENGTH)
+            return
+        
+        # Generate ID (8 hex chars; not security sensitive), hashing the parts
+        # separately instead of building and encoding a concatenated string
+        digest = hashlib.blake2b(content.encode(), digest_size=4)
+        digest.update(repr(time.time()).encode())
+        mem_id = f"mem-{digest.hexdigest()}"
+        
+        new_mem = {
+            "id": mem_id,
+            "type": memory_type,
+            "content": content,
+            "tags": tags,
+            "provenance": {
+                "source": source,
+                "timestamp": None,  # set by the writer thread at commit
+            }
+        }
+        
+        if rationale:
+            new_mem["rationale"] = rationale
+        if confidence is not None:
+            new_mem["confidence"] = confidence
+        
+        # Persisted and searchable when this returns; no full rebuild per write
+        rebuild = submit_write(new_mem)
+        
+        self._send_json({
+            "id": mem_id,
+            "status": "created",
+            "rebuild": rebuild
+        })
+    
+    def _handle_add(self, data: dict):
+        if not data.get("id") or not data.get("content"):
+            self._send_body(_ID_CONTENT_REQUIRED_BODY, 400, _ID_CONTENT_REQUIRED_LENGTH)
+            return
+        
+        # No index to add to yet - build one from the store
+        if not (INDEX_DIR / "faiss.index").exists():
+            trigger_rebuild()
+            self._send_json({"id": data["id"], "status": "rebuild scheduled"})
+            return
+        
+        added = add_to_index(data)
+        if added:
+            response_cache.clear()
+        self._send_json({"id": data["id"], "status": "added" if added else "already indexed"})
+    
+    def _handle_rebuild(self, data: dict):
+        trigger_rebuild()
+        self._send_body(_REBUILD_BODY, length=_REBUILD_LENGTH)
+    
+    # Path -> handler, looked up once per request
+    _GET_ROUTES = {
+        "/health": _handle_health,
+        "/stats": _handle_stats,
+    }
+    _POST_ROUTES = {
+        "/search": _handle_search,
+        "/context": _handle_context,
+        "/write": _handle_write,
+        "/add": _handle_add,
+        "/rebuild": _handle_rebuild,
+    }
+    
     def log_message(self, format, *args):
         print(f"[MEMO] {args[0]}")
 
@@ -231,22 +507,29 @@ def main():
     # Create log directory
     LOG_DIR.mkdir(parents=True, exist_ok=True)
     
-    # Pre-load model and index
+    # Pre-load model, index and memories
     print("[MEMO] Loading model and index...")
     try:
+        cached_memories()
         load_model()
         load_index()
     except Exception as e:
         print(f"[MEMO] Warning: Could not preload index: {e}")
         print("[MEMO] Will build on first write")
+    else:
+        try:
+            warm_up()
+        except Exception as e:
+            print(f"[MEMO] Warning: Warm-up search failed: {e}")
     
-    server = HTTPServer(("127.0.0.1", PORT), MemoryHandler)
+    server = MemoryServer(("127.0.0.1", PORT), MemoryHandler)
     print(f"\n🧠 Memory API Server")
     print(f"   http://localhost:{PORT}")
     print(f"\nEndpoints:")
     print(f"   POST /search   - Semantic search")
     print(f"   POST /context  - LLM context injection")
-    print(f"   POST /write    - Write new memory (auto-rebuilds)")
+    print(f"   POST /write    - Write new memory (indexed in place)")
+    print(f"   POST /add      - Index one stored memory (no rebuild)")
     print(f"   POST /rebuild  - Force rebuild index")
     print(f"   GET  /health   - Health check")
     print(f"   GET  /stats    - Memory statistics")
@@ -0,0 +1,154 @@
+"""
+Shared I/O helpers for the memory store.
+
+Used by server.py, mcp_server.py, index.py, memory_client.py and the
+scripts/ tools so they all read and write memories.json the same way.
+"""
+
+import contextlib
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Callable, Iterator, List
+
+try:
+    import fcntl  # advisory locks between processes sharing the store (POSIX)
+except ImportError:
+    fcntl = None
+
+try:
+    import orjson
+    
+    def json_loads(data):
+        return orjson.loads(data)
+    
+    def json_dumps(obj, indent: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+except ImportError:  # stdlib fallback
+    def json_loads(data):
+        return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+    
+    def json_dumps(obj, indent: bool = False) -> bytes:
+        return json.dumps(obj, indent=2 if indent else None).encode()
+
+
+def load_json_mmap(path: Path):
+    """Parse a JSON file through a read-only mmap (orjson parses the mapped pages in place)"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return json_loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return json_loads(view)
+
+
+def load_journal(journal_path: Path) -> Iterator[dict]:
+    """Yield memories from an append-only journal (one JSON object per line)"""
+    if not journal_path.exists():
+        return
+    with open(journal_path, "rb") as f:
+        for line in f:
+            try:
+                yield json_loads(line)
+            except json.JSONDecodeError:
+                continue  # torn write at the tail
+
+
+def merge_memories(memories: List[dict], others: List[dict]) -> List[dict]:
+    """Append the memories in others whose ids are not in memories yet; returns memories"""
+    if others:
+        known = {m.get("id") for m in memories}
+        memories.extend(m for m in others if m.get("id") not in known)
+    return memories
+
+
+def merge_journal(memories: List[dict], journal_path: Path) -> List[dict]:
+    """Append journaled memories whose ids are not in memories yet; returns memories"""
+    return merge_memories(memories, list(load_journal(journal_path)))
+
+
+def load_snapshot(path: Path) -> dict:
+    """The memories.json snapshot as a dict (also accepts the older bare-list format)"""
+    store = load_json_mmap(path) if path.exists() else {}
+    if isinstance(store, list):
+        store = {"memories": store}
+    store.setdefault("memories", [])
+    return store
+
+
+def save_snapshot(store: dict, path: Path) -> None:
+    """Replace the snapshot (never truncate: readers may have it mapped), indented for git sync"""
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(json_dumps(store, indent=True))
+    os.replace(tmp_path, path)
+
+
+@contextlib.contextmanager
+def journal_lock(journal_path: Path, exclusive: bool = False):
+    """
+    Advisory lock on the store directory, shared by journal appenders and
+    held exclusively while the journal is folded into the snapshot.
+    """
+    if fcntl is None:  # Windows: no flock, compaction is not serialized
+        yield
+        return
+    fd = os.open(journal_path.parent, os.O_RDONLY)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+    finally:
+        os.close(fd)  # releases the lock
+
+
+def append_journal(journal_path: Path, data: bytes) -> int:
+    """Append journal lines in one write; returns the journal size afterwards"""
+    journal_path.parent.mkdir(parents=True, exist_ok=True)
+    with journal_lock(journal_path):
+        with open(journal_path, "ab") as f:
+            f.write(data)
+            return f.tell()
+
+
+def _fold_journal(store: dict, snapshot_path: Path, journal_path: Path, save) -> None:
+    # Caller holds journal_lock exclusively
+    merge_journal(store["memories"], journal_path)
+    save(store, snapshot_path)
+    journal_path.unlink(missing_ok=True)
+
+
+def save_store(
+    store: dict,
+    snapshot_path: Path,
+    journal_path: Path,
+    save: Callable[[dict, Path], None] = save_snapshot,
+) -> None:
+    """
+    Save a store loaded earlier as the snapshot and delete the journal.
+    
+    Memories other processes added since it was loaded - still journaled,
+    or already compacted into the snapshot - are merged in first. Appends
+    wait on the lock meanwhile, so none is lost.
+    """
+    with journal_lock(journal_path, exclusive=True):
+        memories = store.setdefault("memories", [])
+        if snapshot_path.exists():
+            merge_memories(memories, load_snapshot(snapshot_path)["memories"])
+        _fold_journal(store, snapshot_path, journal_path, save)
+
+
+def compact_journal(
+    snapshot_path: Path,
+    journal_path: Path,
+    save: Callable[[dict, Path], None] = save_snapshot,
+) -> None:
+    """
+    Fold the journal into the snapshot and delete it (no-op without a journal).
+    Appends wait on the lock meanwhile, so each line is either folded in or
+    lands in a new journal.
+    """
+    if not journal_path.exists():
+        return
+    with journal_lock(journal_path, exclusive=True):
+        _fold_journal(load_snapshot(snapshot_path), snapshot_path, journal_path, save)